@@ -1,18 +1,37 @@
 import os
-import requests
+import json
+import hashlib
+import signal
 import threading
-from flask import Flask, redirect, request, session, jsonify
+import requests
+from flask import Flask, redirect, request, session, jsonify, Response, stream_with_context
 from dotenv import load_dotenv
 import secrets
 from flask_session import Session
 from flask_cors import CORS, cross_origin
-from jira_api import JiraWatcher
+from jira_api import JiraWatcher, SharedJiraWatcher, paginate_agile, is_done_status, is_issue_complete
+from events import broker, stream_events
+from job_store import JobStore
+from scheduler import WatchScheduler
+from executor import HTTP_TIMEOUT_SECONDS, ManagedExecutor, QueueFull, ShuttingDown, UpstreamBusy, upstream_slot
+from sync_pipeline import SyncPipeline
+from workamajig import LocalWorkamajigAdapter
+from http_cassette import install_from_env
 from main import change_board_status, MONDAY_MAINTENCE_BOARD_ID
 
 import time
 
 load_dotenv()
 
+# Under the debug reloader the parent process only watches files and restarts
+# the child (WERKZEUG_RUN_MAIN=true), which is the one that serves requests
+SERVING_PROCESS = __name__ != '__main__' or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'
+
+# Optional record/replay of upstream HTTP (JMJ_HTTP_MODE), for offline profiling.
+# Only the serving process may open the cassette, or two writers would corrupt it.
+if SERVING_PROCESS:
+    install_from_env()
+
 app = Flask(__name__)
 # Use a consistent secret key for session persistence
 app.secret_key = os.getenv('FLASK_SECRET_KEY')
@@ -35,7 +54,7 @@ REDIRECT_URI = os.getenv("ATLASSIAN_REDIRECT_URI")
 AUTH_URL = "https://auth.atlassian.com/authorize"
 TOKEN_URL = "https://auth.atlassian.com/oauth/token"
 API_URL = "https://api.atlassian.com"
-SCOPES = "read:board-scope:jira-software read:project:jira read:issue:jira-software read:issue:jira read:project.component:jira read:issue-meta:jira"
+SCOPES = "read:board-scope:jira-software read:project:jira read:issue:jira-software read:issue:jira read:project.component:jira read:issue-meta:jira offline_access"
 
 # Monday.com configuration
 MONDAY_API_TOKEN = os.getenv('MONDAY_API_TOKEN')
@@ -48,6 +67,94 @@ ALLOWED_JIRA_KEYS = {"KT-1", "KT-2", "KT-3"}
 # Monday tests in "Kyle Test Group": Test Project 1, 2, 3
 ALLOWED_MONDAY_ITEM_NAMES = {"Test Project 1", "Test Project 2", "Test Project 3"}
 
+# Poll intervals for durable watch jobs (seconds)
+STATUS_POLL_SECONDS = int(os.getenv('STATUS_POLL_SECONDS', '15'))
+COMPLETION_POLL_SECONDS = int(os.getenv('COMPLETION_POLL_SECONDS', '60'))
+# A /watch lapses after this long (or once the issue is done); calling /watch again renews it
+STATUS_WATCH_MAX_SECONDS = int(os.getenv('STATUS_WATCH_MAX_SECONDS', str(7 * 24 * 3600)))
+# Most durable watch jobs kept at once; new watches beyond this get a 429
+MAX_ACTIVE_WATCHES = int(os.getenv('MAX_ACTIVE_WATCHES', '500'))
+
+
+def current_session_id(access_token):
+    """Stable id for this browser session (falls back to a token hash without server-side sessions)."""
+    return getattr(session, 'sid', None) or hashlib.sha256(access_token.encode()).hexdigest()[:32]
+
+
+def share_session_credential(access_token, cloud_id, refresh_token=None):
+    """Offer this session's token to the shared per-issue polls on its cloud.
+
+    Only a fresh sign-in passes `refresh_token`; later calls must not clobber
+    a stored credential that background polls have already refreshed.
+    """
+    resumed = job_store.save_credential(cloud_id, current_session_id(access_token), access_token, refresh_token)
+    if resumed:
+        print(f"Resumed {resumed} watch(es) on cloud {cloud_id} waiting for a new sign-in")
+        scheduler.wake()
+
+
+_refresh_lock = threading.Lock()
+
+
+def refresh_shared_credential(cloud_id, access_token):
+    """Swap an expired stored access token for a new one; returns it, or None.
+
+    Atlassian rotates refresh tokens on every use, so refreshes are
+    serialized and the new pair replaces the old one in the store. Polls
+    that queued up behind the one doing the refresh get the new token too.
+    """
+    with _refresh_lock:
+        credential = job_store.credential_by_token(cloud_id, access_token)
+        if credential is None:
+            return None
+        if credential['access_token'] != access_token:
+            # Another poll rotated this credential while we waited for the lock
+            return credential['access_token']
+        refresh_token = credential['refresh_token']
+        if not refresh_token:
+            return None
+        try:
+            with upstream_slot('jira'):
+                resp = requests.post(TOKEN_URL, json={
+                    'grant_type': 'refresh_token',
+                    'client_id': CLIENT_ID,
+                    'client_secret': CLIENT_SECRET,
+                    'refresh_token': refresh_token
+                }, timeout=HTTP_TIMEOUT_SECONDS)
+            resp.raise_for_status()
+            token_data = resp.json()
+        except (requests.exceptions.RequestException, UpstreamBusy, ValueError) as e:
+            print(f"Could not refresh a stored Jira credential for cloud {cloud_id}: {e}")
+            return None
+        fresh = token_data.get('access_token')
+        if not fresh:
+            return None
+        job_store.rotate_credential(cloud_id, credential['session_id'], fresh, token_data.get('refresh_token'))
+        return fresh
+
+
+class SessionExpired(Exception):
+    """The session's own access token was rejected; the user has to sign in again."""
+
+
+def session_can_read(access_token, cloud_id, issue_key):
+    """Check with the session's own token that it may see the issue.
+
+    Shared polls fetch with whichever stored credential works, so this is
+    what keeps a session from watching issues its Jira account cannot read.
+    Raises SessionExpired on a 401, which says nothing about the issue.
+    """
+    try:
+        JiraWatcher(access_token, cloud_id).get_issue(issue_key)
+        return True
+    except requests.exceptions.HTTPError as e:
+        status = e.response.status_code if e.response is not None else None
+        if status == 401:
+            raise SessionExpired(f"Jira rejected this session's token while checking {issue_key}")
+        if status in (403, 404):
+            return False
+        raise
+
 
 @app.route('/')
 def home(supports_credentials=True):
@@ -72,21 +179,26 @@ def callback(supports_credentials=True):
         return "❌ Invalid state. Possible CSRF attack.", 400
 
     code = request.args.get('code')
-    token_response = requests.post(TOKEN_URL, json={
-        'grant_type': 'authorization_code',
-        'client_id': CLIENT_ID,
-        'client_secret': CLIENT_SECRET,
-        'code': code,
-        'redirect_uri': REDIRECT_URI
-    })
+    with upstream_slot('jira'):
+        token_response = requests.post(TOKEN_URL, json={
+            'grant_type': 'authorization_code',
+            'client_id': CLIENT_ID,
+            'client_secret': CLIENT_SECRET,
+            'code': code,
+            'redirect_uri': REDIRECT_URI
+        }, timeout=HTTP_TIMEOUT_SECONDS)
 
     token_data = token_response.json()
 
     access_token = token_data.get('access_token')
     session['access_token'] = access_token
+    # Granted with offline_access; lets background polls outlive the hour-long access token
+    session['refresh_token'] = token_data.get('refresh_token')
 
     headers = {'Authorization': f'Bearer {access_token}'}
-    cloud_res = requests.get(f"{API_URL}/oauth/token/accessible-resources", headers=headers)
+    with upstream_slot('jira'):
+        cloud_res = requests.get(f"{API_URL}/oauth/token/accessible-resources", headers=headers,
+                                 timeout=HTTP_TIMEOUT_SECONDS)
     cloud_data = cloud_res.json()
 
     if not cloud_data:
@@ -104,11 +216,58 @@ def callback(supports_credentials=True):
 
     session['cloud_id'] = my['id']
     session['site_url'] = my.get('url')
+    share_session_credential(access_token, my['id'], session['refresh_token'])
 
     return redirect('/boards')
 
 
 
+def stream_agile_list(url, headers, values_key):
+    """Stream every page of a Jira Agile list endpoint as JSON or NDJSON.
+
+    `?format=ndjson` returns one item per line; otherwise a single JSON
+    object {"total": N, "<values_key>": [...]} is written out incrementally.
+    The status code is sent before later pages are fetched, so a page that
+    fails mid-stream is reported in-band: a final {"error": ...} line, or an
+    "error" key closing the JSON object. A complete response has neither.
+    """
+    try:
+        total, items = paginate_agile(url, headers=headers, values_key=values_key)
+    except requests.exceptions.HTTPError as e:
+        resp = e.response
+        print("Agile GET status:", resp.status_code)
+        print("WWW-Authenticate:", resp.headers.get('WWW-Authenticate'))
+        print("Body (text):", resp.text)
+        return f"\u274c Error: {resp.status_code} - {resp.text}", resp.status_code
+    except requests.exceptions.RequestException as e:
+        return jsonify({'error': str(e)}), 502
+
+    def stream_error(e):
+        print(f"Agile list stream from {url} cut short: {e}")
+        return {'error': str(e), 'status': getattr(getattr(e, 'response', None), 'status_code', None)}
+
+    if request.args.get('format') == 'ndjson':
+        def generate():
+            try:
+                for item in items:
+                    yield json.dumps(item) + "\n"
+            except (requests.exceptions.RequestException, UpstreamBusy) as e:
+                yield json.dumps(stream_error(e)) + "\n"
+        return Response(generate(), mimetype='application/x-ndjson')
+
+    def generate():
+        yield f'{{"total": {json.dumps(total)}, "{values_key}": ['
+        try:
+            for i, item in enumerate(items):
+                yield ("," if i else "") + json.dumps(item)
+        except (requests.exceptions.RequestException, UpstreamBusy) as e:
+            # Close the list, then splice the error fields into the outer object
+            yield '], ' + json.dumps(stream_error(e))[1:]
+            return
+        yield "]}"
+    return Response(generate(), mimetype='application/json')
+
+
 @app.route('/boards')
 def get_boards(supports_credentials=True):
     access_token = session.get('access_token')
@@ -123,18 +282,25 @@ def get_boards(supports_credentials=True):
     }
 
     jira_url = f"{API_URL}/ex/jira/{cloud_id}/rest/agile/1.0/board"
-    response = requests.get(jira_url, headers=headers)
-    print("Agile GET status:", response.status_code)
-    print("WWW-Authenticate:", response.headers.get('WWW-Authenticate'))
-    try:
-        print("Body:", response.json())
-    except Exception:
-        print("Body (text):", response.text)
+    return stream_agile_list(jira_url, headers, 'values')
 
-    if response.ok:
-        return jsonify(response.json())
-    else:
-        return f"\u274c Error: {response.status_code} - {response.text}"
+
+@app.route('/boards/<int:board_id>/issues')
+def get_board_issues(board_id):
+    """Returns every issue on a Jira board, streamed page by page."""
+    access_token = session.get('access_token')
+    cloud_id = session.get('cloud_id')
+
+    if not access_token or not cloud_id:
+        return redirect('/auth')
+
+    headers = {
+        'Authorization': f'Bearer {access_token}',
+        'Accept': 'application/json'
+    }
+
+    jira_url = f"{API_URL}/ex/jira/{cloud_id}/rest/agile/1.0/board/{board_id}/issue"
+    return stream_agile_list(jira_url, headers, 'issues')
 
 
 
@@ -147,20 +313,42 @@ def watch_issue(issue_key):
     if not access_token or not cloud_id:
         return redirect('/auth')
 
+    busy = backpressure_response(cloud_id, [issue_key])
+    if busy:
+        return busy
+
     try:
-        watcher = JiraWatcher(access_token, cloud_id)
-        # Run the watcher in a background thread so it doesn't block the server
-        watch_thread = threading.Thread(
-            target=watcher.watch_issue_status,
-            args=(issue_key,),
-            daemon=True
-        )
-        watch_thread.start()
-        return jsonify({'message': f'Started watching issue {issue_key} in the background.'})
-    except ValueError as e:
+        if not session_can_read(access_token, cloud_id, issue_key):
+            return jsonify({'error': f'Your Jira account cannot read {issue_key}'}), 403
+        share_session_credential(access_token, cloud_id)
+        # One durable job per (cloud_id, issue_key), shared by every session watching it
+        session_id = current_session_id(access_token)
+        job_store.add_interest(cloud_id, issue_key, f'status:{session_id}', 'status', STATUS_POLL_SECONDS,
+                               session_id)
+        scheduler.wake()
+        return jsonify({
+            'message': f'Started watching issue {issue_key} in the background.',
+            'events_url': f'/events?keys={issue_key}'
+        })
+    except (ValueError, requests.exceptions.RequestException) as e:
         return jsonify({'error': str(e)}), 400
 
 
+@app.route('/watch/<string:issue_key>', methods=['DELETE'])
+def unwatch_issue(issue_key):
+    """Stop this session's status watch; the shared poll ends with its last interest."""
+    access_token = session.get('access_token')
+    cloud_id = session.get('cloud_id')
+
+    if not access_token or not cloud_id:
+        return redirect('/auth')
+
+    job_id = job_store.make_job_id(cloud_id, issue_key)
+    if not job_store.remove_interests(job_id, [f'status:{current_session_id(access_token)}']):
+        return jsonify({'error': f'Not watching {issue_key}'}), 404
+    return jsonify({'message': f'Stopped watching issue {issue_key}.'})
+
+
 @app.route("/resources")
 def view_accessible_resources():
     """
@@ -177,7 +365,8 @@ def view_accessible_resources():
         "Accept": "application/json"
     }
 
-    resp = requests.get(url, headers=headers)
+    with upstream_slot('jira'):
+        resp = requests.get(url, headers=headers, timeout=HTTP_TIMEOUT_SECONDS)
     if resp.status_code != 200:
         return jsonify({"error": resp.text}), resp.status_code
 
@@ -208,7 +397,8 @@ def get_subtasks(parent_key):
     jql = f'parent="{parent_key}" ORDER BY created ASC'
     url = f"{API_URL}/ex/jira/{cloud_id}/rest/agile/1.0/issue/{parent_key}"
 
-    resp = requests.get(url, headers=headers)
+    with upstream_slot('jira'):
+        resp = requests.get(url, headers=headers, timeout=HTTP_TIMEOUT_SECONDS)
     if resp.status_code != 200:
         return jsonify({"error": f"{resp.status_code} - {resp.text}"}), resp.status_code
 
@@ -257,7 +447,8 @@ def fetch_monday_items_with_jira(board_id: str):
     """
 
     data = {'query': query}
-    resp = requests.post(url=monday_url, json=data, headers=headers)
+    with upstream_slot('monday'):
+        resp = requests.post(url=monday_url, json=data, headers=headers, timeout=HTTP_TIMEOUT_SECONDS)
     if resp.status_code != 200:
         raise RuntimeError(f"Monday API error {resp.status_code}: {resp.text}")
 
@@ -287,65 +478,235 @@ def fetch_monday_items_with_jira(board_id: str):
     return out
 
 
-def is_done_status(issue_json: dict) -> bool:
-    """Determine if an issue is in a 'done' category/state."""
+def mark_monday_up_to_date(jira_key: str, monday_item_id: str, monday_item_name: str, cloud_id: str = None,
+                           session_ids=None):
+    """Set a Monday maintenance item to 'UP TO DATE' once its Jira issue is complete.
+
+    The result is published as a 'monday_write' event for the sessions in
+    `session_ids` (by default, whoever watches the issue on `cloud_id`).
+    Returns True once the item needs no further attention (written, or
+    skipped as outside the allowlist), False if the write should be retried.
+    """
+    # Double-check safety before updating Monday
+    if jira_key not in ALLOWED_JIRA_KEYS or monday_item_name not in ALLOWED_MONDAY_ITEM_NAMES:
+        print(f"Skipped update (outside allowlist): Jira {jira_key}, Monday '{monday_item_name}' ({monday_item_id})")
+        return True
     try:
-        status = issue_json['fields']['status']
-        # Prefer statusCategory if available
-        cat = status.get('statusCategory', {}).get('key')
-        if cat:
-            return cat.lower() == 'done'
-        # Fallback to name matching
-        name = status.get('name', '').lower()
-        return name in {'done', 'closed', 'resolved', 'complete'}
-    except Exception:
+        ok = bool(change_board_status(monday_item_id, MONDAY_MAINTENCE_BOARD_ID, 'UP TO DATE'))
+        if ok:
+            print(f"Updated Monday item {monday_item_id} ('{monday_item_name}') to 'UP TO DATE' for Jira {jira_key}")
+        else:
+            print(f"Monday rejected the update for item {monday_item_id} ('{monday_item_name}')")
+        broker.publish('monday_write', audience=session_ids, issue_key=jira_key, cloud_id=cloud_id,
+                       monday_item_id=monday_item_id, monday_item_name=monday_item_name,
+                       status='UP TO DATE', ok=ok)
+        return ok
+    except Exception as e:
+        print(f"Failed to update Monday for item {monday_item_id}: {e}")
+        broker.publish('monday_write', audience=session_ids, issue_key=jira_key, cloud_id=cloud_id,
+                       monday_item_id=monday_item_id, monday_item_name=monday_item_name,
+                       status='UP TO DATE', ok=False, error=str(e))
         return False
 
 
+def check_issue_completion(watcher: JiraWatcher, jira_key: str, monday_item_id: str, monday_item_name: str):
+    """One poll: if the issue (or all its subtasks) is done, update Monday status.
+
+    Sets Monday status to 'UP TO DATE' on completion.
+    Returns (all_done, parent_status_name); all_done stays False until the
+    Monday write has gone through, so the caller keeps polling and retries it.
+    """
+    parent = watcher.get_issue(jira_key)
+    parent_status = parent.get('fields', {}).get('status', {}).get('name')
+    all_done = is_issue_complete(watcher, parent) and mark_monday_up_to_date(
+        jira_key, monday_item_id, monday_item_name, watcher.cloud_id)
+    return all_done, parent_status
+
+
 def monitor_issue_completion(access_token: str, cloud_id: str, jira_key: str, monday_item_id: str, monday_item_name: str, poll_seconds: int = 60):
     """Background worker: poll Jira until the issue (or all its subtasks) are done, then update Monday status.
 
-    Sets Monday status to 'UP TO DATE' on completion.
+    Blocking loop kept for direct/CLI use; the app itself runs this through the durable scheduler.
     """
     watcher = JiraWatcher(access_token, cloud_id)
+    broker.publish('watcher_health', issue_key=jira_key, state='started', monday_item_id=monday_item_id)
 
     while True:
         try:
-            parent = watcher.get_issue(jira_key)
-            subtasks = parent.get('fields', {}).get('subtasks', []) or []
-
-            if not subtasks:
-                # No subtasks; consider parent status only
-                all_done = is_done_status(parent)
-            else:
-                all_done = True
-                for st in subtasks:
-                    st_key = st.get('key')
-                    if not st_key:
-                        continue
-                    st_issue = watcher.get_issue(st_key)
-                    if not is_done_status(st_issue):
-                        all_done = False
-                        break
-
+            all_done, _ = check_issue_completion(watcher, jira_key, monday_item_id, monday_item_name)
             if all_done:
-                # Double-check safety before updating Monday
-                if jira_key in ALLOWED_JIRA_KEYS and monday_item_name in ALLOWED_MONDAY_ITEM_NAMES:
-                    try:
-                        change_board_status(monday_item_id, MONDAY_MAINTENCE_BOARD_ID, 'UP TO DATE')
-                        print(f"Updated Monday item {monday_item_id} ('{monday_item_name}') to 'UP TO DATE' for Jira {jira_key}")
-                    except Exception as e:
-                        print(f"Failed to update Monday for item {monday_item_id}: {e}")
-                else:
-                    print(f"Skipped update (outside allowlist): Jira {jira_key}, Monday '{monday_item_name}' ({monday_item_id})")
+                broker.publish('watcher_health', issue_key=jira_key, state='completed', monday_item_id=monday_item_id)
                 break
 
+            broker.publish('watcher_health', issue_key=jira_key, state='alive', monday_item_id=monday_item_id)
             time.sleep(poll_seconds)
         except Exception as e:
             print(f"Error while monitoring {jira_key}: {e}")
+            broker.publish('watcher_health', issue_key=jira_key, state='error', monday_item_id=monday_item_id, error=str(e))
             time.sleep(poll_seconds)
 
 
+_queued_writes = set()
+_queued_writes_lock = threading.Lock()
+
+
+def queue_monday_up_to_date(jira_key: str, monday_item_id: str, monday_item_name: str, cloud_id: str = None,
+                            session_ids=None, interest_ids=()):
+    """Persist a Monday write, then hand it to the background executor.
+
+    The stored row (and the completion interests in `interest_ids`) are only
+    dropped once the write has succeeded, so a write that fails, or is still
+    pending when the process stops, is retried by the next poll or replayed on
+    the next startup. A write already queued for the item is not queued twice.
+    """
+    write_id = f"monday_up_to_date:{monday_item_id}"
+    session_ids = sorted(session_ids) if session_ids is not None else None
+    payload = {'jira_key': jira_key, 'monday_item_id': monday_item_id, 'monday_item_name': monday_item_name,
+               'cloud_id': cloud_id, 'session_ids': session_ids, 'interest_ids': sorted(interest_ids)}
+
+    with _queued_writes_lock:
+        if write_id in _queued_writes:
+            return
+        _queued_writes.add(write_id)
+
+    def abandoned():
+        print(f"Monday write for item {monday_item_id} ('{monday_item_name}') left pending for the next startup")
+
+    try:
+        job_store.save_pending_write(write_id, 'monday_up_to_date', payload)
+        background.submit(run_monday_write, write_id, payload, name=write_id, on_abandon=abandoned)
+    except QueueFull:
+        # Called from a background worker already: run it here rather than drop it
+        run_monday_write(write_id, payload)
+    except BaseException as e:
+        with _queued_writes_lock:
+            _queued_writes.discard(write_id)
+        if not isinstance(e, ShuttingDown):
+            raise
+        abandoned()
+
+
+def run_monday_write(write_id, payload):
+    """Apply one persisted Monday write; settle its row and interests only on success."""
+    p = payload
+    try:
+        if not mark_monday_up_to_date(p['jira_key'], p['monday_item_id'], p['monday_item_name'],
+                                      p.get('cloud_id'), p.get('session_ids')):
+            print(f"Monday write for item {p['monday_item_id']} failed; will retry")
+            return
+        if p.get('cloud_id') and p.get('interest_ids'):
+            job_store.remove_interests(job_store.make_job_id(p['cloud_id'], p['jira_key']), p['interest_ids'])
+            broker.publish('watcher_health', audience=p.get('session_ids'), issue_key=p['jira_key'],
+                           cloud_id=p['cloud_id'], state='completed', monday_item_id=p['monday_item_id'])
+        job_store.delete_pending_write(write_id)
+    finally:
+        with _queued_writes_lock:
+            _queued_writes.discard(write_id)
+
+
+def resume_pending_writes():
+    """Re-queue Monday writes that had not gone through before the last shutdown."""
+    pending = job_store.pending_writes()
+    for write in pending:
+        if write['kind'] == 'monday_up_to_date':
+            p = write['payload']
+            queue_monday_up_to_date(p['jira_key'], p['monday_item_id'], p['monday_item_name'],
+                                    p.get('cloud_id'), p.get('session_ids'), p.get('interest_ids', ()))
+    if pending:
+        print(f"Resumed {len(pending)} pending write(s) from the last shutdown")
+
+
+def run_issue_job(job):
+    """Scheduler handler for a shared (cloud_id, issue_key) poll.
+
+    Fetches the issue once with any stored credential that can read it, then
+    fans the result out to every interest: status watchers get change events
+    until the issue is done or their watch lapses, Monday items are marked up
+    to date once the issue is complete, and their interests are retired when
+    that write succeeds. The job finishes when no interests are left.
+    """
+    job_id, issue_key = job['job_id'], job['issue_key']
+    interests = job_store.get_interests(job_id)
+    if not interests:
+        return True, job['last_state']
+
+    watcher = SharedJiraWatcher(
+        job['cloud_id'],
+        lambda: job_store.credentials_for(job['cloud_id']),
+        lambda token, ok: job_store.mark_credential(job['cloud_id'], token, ok),
+        lambda token: refresh_shared_credential(job['cloud_id'], token)
+    )
+    parent = watcher.get_issue(issue_key)
+    last_status = (job['last_state'] or {}).get('status')
+    current_status = watcher.check_issue_status(issue_key, last_status, issue=parent,
+                                                audience={i['session_id'] for i in interests})
+
+    lapse_before = time.time() - STATUS_WATCH_MAX_SECONDS
+    retired = [i for i in interests if i['kind'] == 'status'
+               and (is_done_status(parent) or i['created_at'] < lapse_before)]
+    if retired:
+        job_store.remove_interests(job_id, [i['interest_id'] for i in retired])
+        broker.publish('watcher_health', audience={i['session_id'] for i in retired}, issue_key=issue_key,
+                       cloud_id=job['cloud_id'], state='stopped', status=current_status)
+        interests = [i for i in interests if i not in retired]
+
+    completions = [i for i in interests if i['kind'] == 'completion']
+    if completions and is_issue_complete(watcher, parent):
+        # Several sessions may watch the same Monday item: write it once
+        by_item = {}
+        for interest in completions:
+            by_item.setdefault(interest['payload']['monday_item_id'], []).append(interest)
+        for item_id, item_interests in by_item.items():
+            queue_monday_up_to_date(issue_key, item_id, item_interests[0]['payload']['monday_item_name'],
+                                    job['cloud_id'], {i['session_id'] for i in item_interests},
+                                    [i['interest_id'] for i in item_interests])
+
+    return not interests, {'status': current_status}
+
+
+job_store = JobStore()
+background = ManagedExecutor()
+pipeline_lock = threading.Lock()
+scheduler = WatchScheduler(job_store, background)
+scheduler.register('issue', run_issue_job)
+
+
+def queue_full_response():
+    return jsonify({'error': 'Too much background work queued; retry shortly'}), 429, {'Retry-After': '5'}
+
+
+def shutting_down_response():
+    return jsonify({'error': 'Shutting down; retry shortly'}), 503, {'Retry-After': '30'}
+
+
+def backpressure_response(cloud_id=None, issue_keys=()):
+    """429 when the background queue is full, or when watching `issue_keys`
+    would take the durable watch queue past MAX_ACTIVE_WATCHES; 503 while
+    draining; None if there is room."""
+    if not background.stats()['accepting']:
+        return shutting_down_response()
+    if not background.available():
+        return queue_full_response()
+    new_jobs = job_store.count_new_jobs(cloud_id, issue_keys) if issue_keys else 0
+    if new_jobs and job_store.count_active() + new_jobs > MAX_ACTIVE_WATCHES:
+        return jsonify({'error': f'Watch limit reached ({MAX_ACTIVE_WATCHES} active watches); retry later'}), \
+            429, {'Retry-After': '60'}
+    return None
+
+
+@app.errorhandler(SessionExpired)
+def session_expired(e):
+    """The session's access token has expired: send the user back through sign-in."""
+    session.pop('access_token', None)
+    return redirect('/auth')
+
+
+@app.errorhandler(UpstreamBusy)
+def upstream_busy(e):
+    """A request thread could not get an upstream slot in time: 503 instead of hanging."""
+    return jsonify({'error': str(e)}), 503, {'Retry-After': '5'}
+
+
 @app.route('/sync_monday_jira')
 def sync_monday_jira():
     """Start background watchers for all Monday items that have Jira keys.
@@ -357,35 +718,186 @@ def sync_monday_jira():
     if not access_token or not cloud_id:
         return redirect('/auth')
 
+    busy = backpressure_response()
+    if busy:
+        return busy
+
+    share_session_credential(access_token, cloud_id)
+
     board_id = MONDAY_MAINTENCE_BOARD_ID
     if not board_id:
         return jsonify({'error': 'MONDAY_MAINTENCE_BOARD_ID not configured'}), 500
 
     try:
         items = fetch_monday_items_with_jira(board_id)
+    except UpstreamBusy:
+        raise
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-    started = 0
+    session_id = current_session_id(access_token)
+    watchable = []
+    unreadable = []
     for item in items:
         jira_key = item['jira_key']
-        item_id = item['item_id']
         item_name = item['name']
 
         # Extra guard on the route level
         if jira_key not in ALLOWED_JIRA_KEYS or item_name not in ALLOWED_MONDAY_ITEM_NAMES:
             continue
 
-        t = threading.Thread(
-            target=monitor_issue_completion,
-            args=(access_token, cloud_id, jira_key, item_id, item_name),
-            daemon=True
+        try:
+            readable = session_can_read(access_token, cloud_id, jira_key)
+        except requests.exceptions.RequestException as e:
+            print(f"Could not check access to {jira_key}: {e}")
+            readable = False
+        if not readable:
+            unreadable.append(jira_key)
+            continue
+        watchable.append(item)
+
+    busy = backpressure_response(cloud_id, [item['jira_key'] for item in watchable])
+    if busy:
+        return busy
+
+    for item in watchable:
+        job_store.add_interest(
+            cloud_id, item['jira_key'], f"completion:{item['item_id']}:{session_id}", 'completion',
+            COMPLETION_POLL_SECONDS, session_id,
+            payload={'monday_item_id': item['item_id'], 'monday_item_name': item['name']}
         )
-        t.start()
-        started += 1
 
-    return jsonify({'message': f'Started watchers for {started} Monday items', 'items': items})
+    scheduler.wake()
+
+    return jsonify({
+        'message': f'Started watchers for {len(watchable)} Monday items',
+        'items': watchable,
+        'unreadable': unreadable,
+        'events_url': '/events?keys=' + ','.join(item['jira_key'] for item in watchable)
+    })
+
+
+@app.route('/sync_pipeline')
+def run_sync_pipeline():
+    """Queue one pass of the staged Jira / Monday / Workamajig sync.
+
+    Only records whose content changed since the last pass produce writes.
+    The run summary is published as a 'sync_run' event.
+    Uses the current OAuth session's access_token and cloud_id.
+    """
+    access_token = session.get('access_token')
+    cloud_id = session.get('cloud_id')
+    if not access_token or not cloud_id:
+        return redirect('/auth')
+
+    if not MONDAY_MAINTENCE_BOARD_ID:
+        return jsonify({'error': 'MONDAY_MAINTENCE_BOARD_ID not configured'}), 500
+
+    pipeline = SyncPipeline(
+        job_store,
+        JiraWatcher(access_token, cloud_id),
+        LocalWorkamajigAdapter(),
+        MONDAY_MAINTENCE_BOARD_ID,
+        MONDAY_DX_RESOURCING_BOARD_ID,
+        allowed_jira_keys=ALLOWED_JIRA_KEYS,
+        allowed_monday_names=ALLOWED_MONDAY_ITEM_NAMES,
+        session_id=current_session_id(access_token)
+    )
+
+    # One pass at a time: concurrent passes would race on the snapshots
+    if not pipeline_lock.acquire(blocking=False):
+        return jsonify({'error': 'A sync pipeline run is already in progress'}), 409
+
+    def run():
+        try:
+            pipeline.run()
+        finally:
+            pipeline_lock.release()
+
+    try:
+        background.submit(run, name='sync_pipeline')
+    except QueueFull:
+        pipeline_lock.release()
+        return queue_full_response()
+    except ShuttingDown:
+        pipeline_lock.release()
+        return shutting_down_response()
+
+    return jsonify({
+        'message': 'Sync pipeline run queued',
+        'events_url': '/events?types=sync_run,monday_write'
+    }), 202
+
+
+@app.route('/events')
+def events():
+    """Server-Sent Events stream of live sync status.
+
+    Streams status transitions, Monday write results and watcher health for
+    the issues this session watches, plus results of its own sync runs.
+    Optional query params (comma separated):
+      - types: event types to receive (status_change, monday_write, watcher_health)
+      - keys: Jira issue keys to receive
+    """
+    access_token = session.get('access_token')
+    cloud_id = session.get('cloud_id')
+    if not access_token or not cloud_id:
+        return redirect('/auth')
+    session_id = current_session_id(access_token)
+
+    def visible(event):
+        # Shared polls publish once per issue: only pass on what this session registered.
+        # Poll events carry their audience; the store lookup is for the rare untagged event.
+        if event['audience'] is not None:
+            return session_id in event['audience']
+        data = event['data']
+        return (data.get('cloud_id') == cloud_id and data.get('issue_key') is not None
+                and job_store.session_watches(session_id, cloud_id, data['issue_key']))
+
+    types = [t for t in request.args.get('types', '').split(',') if t]
+    keys = [k for k in request.args.get('keys', '').split(',') if k]
+    q = broker.subscribe(topics=types or None, issue_keys=keys or None, accept=visible)
+
+    def generate():
+        try:
+            yield from stream_events(q)
+        finally:
+            # Runs when the client disconnects and the generator is closed
+            broker.unsubscribe(q)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+# Resume stored watches; overdue ones are spread out rather than polled all at once.
+# Under the debug reloader only the serving child process runs jobs.
+# WATCH_SCHEDULER=off leaves stored watches alone (e.g. when profiling one function).
+if os.getenv('WATCH_SCHEDULER', 'on') != 'off' and SERVING_PROCESS:
+    resume_pending_writes()
+    scheduler.start()
+
+
+_previous_sigterm = signal.getsignal(signal.SIGTERM)
+
+
+def drain_on_sigterm(signum, frame):
+    """Stop scheduling, let in-flight work finish and persist pending writes, then exit."""
+    print("SIGTERM received; draining background work")
+    scheduler.stop()
+    background.drain()
+    if callable(_previous_sigterm):
+        _previous_sigterm(signum, frame)
+    else:
+        raise SystemExit(0)
+
+
+# Signal handlers can only be installed from the main thread
+if threading.current_thread() is threading.main_thread():
+    signal.signal(signal.SIGTERM, drain_on_sigterm)
 
 
 if __name__ == '__main__':
-    app.run(host="localhost", port=5000, debug=True)
+    app.run(host="localhost", port=5000, debug=True, threaded=True)
@@ -0,0 +1,105 @@
+import json
+import queue
+import threading
+import time
+
+
+class EventBroker:
+    """In-process pub/sub fan-out for sync events.
+
+    Every subscriber gets its own bounded queue. Publishing never blocks: if a
+    subscriber falls too far behind, its oldest events are dropped so one slow
+    dashboard cannot stall the watchers.
+    """
+
+    def __init__(self, max_queue=1000):
+        self.max_queue = max_queue
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    def subscribe(self, topics=None, issue_keys=None, accept=None):
+        """Register a subscriber and return its queue.
+
+        topics: optional set of event types to receive (None = everything).
+        issue_keys: optional set of Jira keys to receive (None = every issue).
+        accept: optional callable(event) -> bool applied after the filters
+            above, e.g. to limit a stream to what one session may see.
+        """
+        q = queue.Queue(maxsize=self.max_queue)
+        q.topics = set(topics) if topics else None
+        q.issue_keys = set(issue_keys) if issue_keys else None
+        q.accept = accept
+        with self._lock:
+            self._subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def publish(self, event_type, audience=None, **data):
+        """Fan an event out to every interested subscriber.
+
+        audience: optional collection of session ids the event is meant for;
+        it is kept off the wire and only consulted by `accept` filters.
+        """
+        with self._lock:
+            self._next_id += 1
+            event = {
+                'id': self._next_id,
+                'type': event_type,
+                'ts': time.time(),
+                'data': data,
+                'audience': set(audience) if audience is not None else None,
+            }
+            subscribers = list(self._subscribers)
+
+        for q in subscribers:
+            if q.topics is not None and event_type not in q.topics:
+                continue
+            if q.issue_keys is not None and data.get('issue_key') not in q.issue_keys:
+                continue
+            if q.accept is not None:
+                try:
+                    if not q.accept(event):
+                        continue
+                except Exception as e:
+                    print(f"Event filter failed; not delivering {event_type}: {e}")
+                    continue
+            try:
+                q.put_nowait(event)
+            except queue.Full:
+                # Drop the oldest event to make room for the newest one
+                try:
+                    q.get_nowait()
+                except queue.Empty:
+                    pass
+                try:
+                    q.put_nowait(event)
+                except queue.Full:
+                    pass
+        return event
+
+
+def format_sse(event):
+    """Serialize an event dict into the text/event-stream wire format."""
+    payload = json.dumps(event['data'])
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {payload}\n\n"
+
+
+def stream_events(q, heartbeat_seconds=15):
+    """Yield SSE frames from a subscriber queue, with keep-alive comments."""
+    yield ": connected\n\n"
+    while True:
+        try:
+            event = q.get(timeout=heartbeat_seconds)
+        except queue.Empty:
+            # Comment line keeps proxies from closing an idle connection
+            yield ": keep-alive\n\n"
+            continue
+        yield format_sse(event)
+
+
+# Shared broker used by the Flask app and the background watchers
+broker = EventBroker()
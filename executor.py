@@ -0,0 +1,185 @@
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Max simultaneous in-flight requests per upstream API, across all threads
+UPSTREAM_LIMITS = {
+    'jira': int(os.getenv('JIRA_MAX_CONCURRENCY', '8')),
+    'monday': int(os.getenv('MONDAY_MAX_CONCURRENCY', '4')),
+    'workamajig': int(os.getenv('WORKAMAJIG_MAX_CONCURRENCY', '2')),
+}
+BACKGROUND_WORKERS = int(os.getenv('BACKGROUND_WORKERS', '8'))
+BACKGROUND_QUEUE_SIZE = int(os.getenv('BACKGROUND_QUEUE_SIZE', '100'))
+DRAIN_TIMEOUT_SECONDS = float(os.getenv('DRAIN_TIMEOUT_SECONDS', '25'))
+# Every upstream call made while holding a slot passes this as its timeout
+HTTP_TIMEOUT_SECONDS = float(os.getenv('HTTP_TIMEOUT_SECONDS', '30'))
+# How long a caller waits for a free upstream slot before giving up
+UPSTREAM_SLOT_WAIT_SECONDS = float(os.getenv('UPSTREAM_SLOT_WAIT_SECONDS', '10'))
+
+_upstream_slots = {name: threading.BoundedSemaphore(limit) for name, limit in UPSTREAM_LIMITS.items()}
+
+
+class UpstreamBusy(Exception):
+    """No upstream slot freed up in time; the caller should retry later (503)."""
+
+
+@contextmanager
+def upstream_slot(name, timeout=UPSTREAM_SLOT_WAIT_SECONDS):
+    """Hold one of the limited concurrency slots for an upstream API call.
+
+    Raises UpstreamBusy if none frees up within `timeout` seconds, so request
+    threads fail fast instead of queueing behind a stalled upstream.
+    """
+    slot = _upstream_slots[name]
+    if not slot.acquire(timeout=timeout):
+        raise UpstreamBusy(f"All {UPSTREAM_LIMITS[name]} {name} slots busy; retry shortly")
+    try:
+        yield
+    finally:
+        slot.release()
+
+
+class QueueFull(Exception):
+    """The background queue is at capacity; the caller should retry later (429)."""
+
+
+class ShuttingDown(Exception):
+    """The executor is draining and accepts no new work (503)."""
+
+
+class _Task:
+    def __init__(self, fn, args, kwargs, name, on_abandon):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.name = name
+        self.on_abandon = on_abandon
+
+
+class ManagedExecutor:
+    """Fixed pool of workers fed from a bounded queue, with graceful drain.
+
+    submit() never blocks: it raises QueueFull when the queue is at capacity
+    and ShuttingDown once drain() has started. Tasks may pass `on_abandon`,
+    called if drain() times out before the task ran or finished, so work like
+    a Monday write can be persisted and retried after a restart.
+    """
+
+    def __init__(self, workers=BACKGROUND_WORKERS, queue_size=BACKGROUND_QUEUE_SIZE):
+        self.workers = workers
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._accepting = True
+        self._closed = False
+        self._lock = threading.Lock()
+        self._in_flight = set()
+        self._threads = []
+        for i in range(workers):
+            t = threading.Thread(target=self._worker, name=f'background-{i}', daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def submit(self, fn, *args, name=None, on_abandon=None, **kwargs):
+        if not self._accepting:
+            raise ShuttingDown("Shutting down; not accepting new background work")
+        task = _Task(fn, args, kwargs, name or getattr(fn, '__name__', 'task'), on_abandon)
+        try:
+            self._queue.put_nowait(task)
+        except queue.Full:
+            raise QueueFull(f"Background queue is full ({self._queue.maxsize} pending)")
+        return task
+
+    def available(self):
+        """Free queue slots right now (a hint; another submitter may take them)."""
+        return 0 if not self._accepting else max(0, self._queue.maxsize - self._queue.qsize())
+
+    def stats(self):
+        with self._lock:
+            in_flight = len(self._in_flight)
+        return {
+            'accepting': self._accepting,
+            'queued': self._queue.qsize(),
+            'queue_size': self._queue.maxsize,
+            'in_flight': in_flight,
+            'workers': self.workers,
+        }
+
+    def _worker(self):
+        while True:
+            task = self._queue.get()
+            if task is None:
+                return
+            with self._lock:
+                closed = self._closed
+                if not closed:
+                    self._in_flight.add(task)
+            if closed:
+                # Picked up after drain gave up: treat like any other leftover
+                try:
+                    if task.on_abandon:
+                        task.on_abandon()
+                except Exception as e:
+                    print(f"Could not persist abandoned task {task.name}: {e}")
+                finally:
+                    self._queue.task_done()
+                continue
+            try:
+                task.fn(*task.args, **task.kwargs)
+            except BaseException as e:
+                # Includes BaseExceptions such as http_cassette.CassetteMiss:
+                # a task must never take its worker thread down with it
+                print(f"Background task {task.name} failed: {e!r}")
+            finally:
+                with self._lock:
+                    self._in_flight.discard(task)
+                self._queue.task_done()
+
+    def drain(self, timeout=DRAIN_TIMEOUT_SECONDS):
+        """Stop accepting work and let queued and running tasks finish.
+
+        Whatever has not finished by the deadline is handed to its on_abandon
+        callback. That includes tasks still running, so abandoned work must be
+        safe to repeat (setting a Monday status is). Returns the number of
+        tasks abandoned.
+        """
+        self._accepting = False
+        deadline = time.monotonic() + timeout
+        print(f"Draining background work: {self.stats()}")
+
+        # unfinished_tasks counts queued and running tasks until task_done()
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.1)
+
+        with self._lock:
+            self._closed = True
+            abandoned = list(self._in_flight)
+        while True:
+            try:
+                task = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if task is not None:
+                abandoned.append(task)
+            self._queue.task_done()
+
+        for task in abandoned:
+            if task.on_abandon:
+                try:
+                    task.on_abandon()
+                except Exception as e:
+                    print(f"Could not persist abandoned task {task.name}: {e}")
+            else:
+                print(f"Dropped unfinished background task {task.name}")
+
+        for _ in self._threads:
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                break
+        print(f"Drain finished; {len(abandoned)} task(s) did not complete")
+        return len(abandoned)
@@ -0,0 +1,303 @@
+"""Record/replay harness for the upstream HTTP calls (Atlassian, Monday).
+
+Record mode captures every request made through `requests` to a gzip'd
+JSON-lines cassette; replay mode serves those responses back, instantly or
+at the recorded (optionally accelerated) timing, so sync code paths can be
+profiled and benchmarked offline.
+
+Enable for the Flask app with environment variables:
+    JMJ_HTTP_MODE=record|replay  JMJ_CASSETTE=path.jsonl.gz  JMJ_REPLAY_SPEED=0
+
+Or run and profile a single function from the command line:
+    python http_cassette.py record run.jsonl.gz app:monitor_issue_completion TOKEN CLOUD KT-1 123 "Test Project 1"
+    python http_cassette.py replay run.jsonl.gz --speed 0 --profile run.prof app:monitor_issue_completion TOKEN CLOUD KT-1 123 "Test Project 1"
+"""
+import argparse
+import atexit
+import cProfile
+import gzip
+import hashlib
+import importlib
+import json
+import os
+import pstats
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import timedelta
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# JSON response fields that hold credentials and must never reach disk
+REDACTED_FIELDS = {'access_token', 'refresh_token', 'client_secret', 'id_token'}
+KEPT_RESPONSE_HEADERS = {'content-type', 'www-authenticate', 'retry-after'}
+
+_original_request = requests.sessions.Session.request
+_real_sleep = time.sleep
+
+
+class CassetteMiss(BaseException):
+    """Replay asked for a request the cassette does not contain.
+
+    Derives from BaseException on purpose: sync loops catch Exception and
+    retry forever, which would hide the miss and hang the replay.
+    """
+
+
+def _normalize_url(url, params=None):
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    if params:
+        query += [(k, str(v)) for k, v in (params.items() if isinstance(params, dict) else params)]
+    return urlunsplit(parts._replace(query=urlencode(sorted(query))))
+
+
+def _body_hash(kwargs):
+    body = kwargs.get('json')
+    if body is not None:
+        raw = json.dumps(body, sort_keys=True).encode()
+    else:
+        raw = kwargs.get('data') or b''
+        raw = raw.encode() if isinstance(raw, str) else raw
+        if not isinstance(raw, bytes):
+            raw = repr(raw).encode()
+    return hashlib.sha1(raw).hexdigest()[:16] if raw else ''
+
+
+def _request_key(method, url, kwargs):
+    return f"{method.upper()} {_normalize_url(url, kwargs.get('params'))} {_body_hash(kwargs)}"
+
+
+def _redact(text):
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return text
+    if isinstance(data, dict) and REDACTED_FIELDS & data.keys():
+        data = {k: ('REDACTED' if k in REDACTED_FIELDS else v) for k, v in data.items()}
+        return json.dumps(data)
+    return text
+
+
+class Cassette:
+    """Installs itself over requests.Session.request while active."""
+
+    def __init__(self, path, mode, speed=0.0, scale_sleep=False):
+        if mode not in ('record', 'replay'):
+            raise ValueError("mode must be 'record' or 'replay'")
+        self.path = path
+        self.mode = mode
+        self.speed = speed
+        self.scale_sleep = scale_sleep
+        self._lock = threading.Lock()
+        self._start = None
+        self._file = None
+        self._entries = defaultdict(deque)
+        self.request_count = 0
+        self.upstream_seconds = 0.0
+
+    # --- lifecycle -------------------------------------------------------
+
+    def start(self):
+        self._start = time.monotonic()
+        if self.mode == 'record':
+            self._file = gzip.open(self.path, 'wt', encoding='utf-8')
+        else:
+            with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    entry = json.loads(line)
+                    self._entries[entry['key']].append(entry)
+            if self.scale_sleep:
+                time.sleep = self._scaled_sleep
+
+        cassette = self
+
+        def request(session, method, url, **kwargs):
+            return cassette._handle(session, method, url, kwargs)
+
+        requests.sessions.Session.request = request
+        print(f"HTTP cassette {self.mode}: {self.path}")
+        return self
+
+    def stop(self):
+        requests.sessions.Session.request = _original_request
+        time.sleep = _real_sleep
+        if self._file:
+            self._file.close()
+            self._file = None
+        print(f"HTTP cassette {self.mode} done: {self.request_count} requests, "
+              f"{self.upstream_seconds:.2f}s upstream time")
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def remaining(self):
+        """Number of recorded responses that were never replayed."""
+        with self._lock:
+            return sum(len(q) for q in self._entries.values())
+
+    # --- request handling ------------------------------------------------
+
+    def _handle(self, session, method, url, kwargs):
+        key = _request_key(method, url, kwargs)
+        if self.mode == 'record':
+            return self._record(session, method, url, kwargs, key)
+        return self._replay(method, url, key)
+
+    def _record(self, session, method, url, kwargs, key):
+        started = time.monotonic()
+        error = None
+        try:
+            response = _original_request(session, method, url, **kwargs)
+        except requests.exceptions.RequestException as e:
+            response, error = None, e
+        duration = time.monotonic() - started
+
+        entry = {
+            'key': key,
+            'at': round(started - self._start, 4),
+            'duration': round(duration, 4),
+        }
+        if error is not None:
+            entry['error'] = repr(error)
+        else:
+            entry.update({
+                'status': response.status_code,
+                'headers': {k: v for k, v in response.headers.items() if k.lower() in KEPT_RESPONSE_HEADERS},
+                'body': _redact(response.text),
+            })
+        with self._lock:
+            self._file.write(json.dumps(entry) + "\n")
+            self.request_count += 1
+            self.upstream_seconds += duration
+
+        if error is not None:
+            raise error
+        return response
+
+    def _replay(self, method, url, key):
+        with self._lock:
+            queue = self._entries.get(key)
+            if not queue:
+                raise CassetteMiss(f"No recorded response for {key}")
+            entry = queue.popleft()
+            self.request_count += 1
+            self.upstream_seconds += entry['duration']
+
+        if self.speed > 0:
+            _real_sleep(entry['duration'] / self.speed)
+
+        if 'error' in entry:
+            raise requests.exceptions.ConnectionError(f"Replayed error: {entry['error']}")
+
+        response = requests.models.Response()
+        response.status_code = entry['status']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response._content = entry['body'].encode('utf-8')
+        response.encoding = 'utf-8'
+        response.url = url
+        response.reason = 'Replayed'
+        response.elapsed = timedelta(seconds=entry['duration'])
+        response.request = requests.Request(method.upper(), url).prepare()
+        return response
+
+    def _scaled_sleep(self, seconds):
+        # Poll loops sleep between requests; compress that idle time too
+        _real_sleep(seconds / self.speed if self.speed > 0 else 0)
+
+
+def install_from_env():
+    """Start a cassette if JMJ_HTTP_MODE is set; returns it (or None)."""
+    mode = os.getenv('JMJ_HTTP_MODE')
+    if not mode:
+        return None
+    path = os.getenv('JMJ_CASSETTE', 'http_cassette.jsonl.gz')
+    speed = float(os.getenv('JMJ_REPLAY_SPEED', '0'))
+    cassette = Cassette(path, mode, speed=speed).start()
+    # Record mode writes through gzip; close it so the cassette is readable
+    atexit.register(cassette.stop)
+    return cassette
+
+
+def profile_call(func, args=(), kwargs=None, output=None, top=25):
+    """Run func under cProfile; dump stats to `output` and print the hot spots.
+
+    Runs in the calling (main) thread so py-spy's view matches cProfile's.
+    """
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    profiler.enable()
+    try:
+        return func(*args, **(kwargs or {}))
+    finally:
+        profiler.disable()
+        wall = time.perf_counter() - started
+        print(f"Wall time: {wall:.3f}s")
+        if output:
+            profiler.dump_stats(output)
+            print(f"Profile written to {output}")
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(top)
+
+
+def _load_target(spec):
+    module_name, _, func_name = spec.partition(':')
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record or replay upstream HTTP for a sync function.")
+    parser.add_argument('mode', choices=['record', 'replay'])
+    parser.add_argument('cassette', help="Cassette path (.jsonl.gz)")
+    parser.add_argument('target', help="module:function to run, e.g. app:monitor_issue_completion")
+    parser.add_argument('args', nargs='*', help="Positional arguments passed to the target")
+    parser.add_argument('--speed', type=float, default=0,
+                        help="Replay speed: 0 = instant, 1 = recorded timing, 10 = 10x faster")
+    parser.add_argument('--profile', metavar='OUT', help="Write cProfile stats to OUT")
+    parser.add_argument('--stats-json', metavar='OUT', help="Append a run summary to OUT for run-to-run comparison")
+    opts = parser.parse_args()
+
+    print(f"PID {os.getpid()} (attach with: py-spy record --pid {os.getpid()})")
+    # Only the target should talk to upstream; keep stored watches from running,
+    # and keep an imported app from opening a second cassette of its own
+    os.environ['WATCH_SCHEDULER'] = 'off'
+    os.environ.pop('JMJ_HTTP_MODE', None)
+    target = _load_target(opts.target)
+    cassette = Cassette(opts.cassette, opts.mode, speed=opts.speed, scale_sleep=opts.mode == 'replay')
+
+    started = time.perf_counter()
+    end = 'error'
+    try:
+        with cassette:
+            if opts.profile:
+                profile_call(target, opts.args, output=opts.profile)
+            else:
+                target(*opts.args)
+        end = 'returned'
+    except CassetteMiss as e:
+        # Polling targets (e.g. monitor_issue_completion) only stop when the tape runs out
+        end = 'end_of_tape'
+        print(f"Replay stopped: {e}")
+    finally:
+        wall = time.perf_counter() - started
+        if opts.stats_json:
+            summary = {
+                'target': opts.target,
+                'mode': opts.mode,
+                'speed': opts.speed,
+                'end': end,
+                'wall_seconds': round(wall, 4),
+                'requests': cassette.request_count,
+                'upstream_seconds': round(cassette.upstream_seconds, 4),
+                'unused_responses': cassette.remaining() if opts.mode == 'replay' else 0,
+            }
+            with open(opts.stats_json, 'a') as f:
+                f.write(json.dumps(summary) + "\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,111 @@
 import requests
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import os
 from dotenv import load_dotenv
 
+from events import broker
+from executor import HTTP_TIMEOUT_SECONDS, upstream_slot
+
 load_dotenv()
 
 API_URL = "https://api.atlassian.com"
 
+# Agile API pagination defaults (Jira caps maxResults at 50 for most endpoints)
+AGILE_PAGE_SIZE = 50
+AGILE_PAGE_WORKERS = 4
+
+
+def paginate_agile(url, headers=None, auth=None, values_key='values', params=None,
+                   page_size=AGILE_PAGE_SIZE, max_workers=AGILE_PAGE_WORKERS):
+    """Page through a Jira Agile list endpoint (startAt/maxResults).
+
+    The first page is fetched right away so callers can report errors before
+    they start streaming; it raises requests.HTTPError on failure. Once the
+    first page reveals `total`, the remaining pages are fetched in parallel,
+    at most `max_workers` at a time, and yielded in order so memory stays
+    bounded to one window of pages.
+
+    Returns (total, iterator over items). total is None if Jira did not say.
+    """
+    session = requests.Session()
+    session.headers.update(headers or {})
+    session.auth = auth
+    base_params = dict(params or {})
+
+    def fetch(start_at):
+        with upstream_slot('jira'):
+            resp = session.get(url, params={**base_params, 'startAt': start_at, 'maxResults': page_size},
+                               timeout=HTTP_TIMEOUT_SECONDS)
+        resp.raise_for_status()
+        return resp.json()
+
+    first = fetch(0)
+    first_values = first.get(values_key, [])
+    total = first.get('total')
+    # Jira may return fewer than requested; use the page size it actually granted
+    granted = first.get('maxResults') or len(first_values) or page_size
+
+    def items():
+        yield from first_values
+        if first.get('isLast') or not first_values:
+            return
+
+        if total is None:
+            # No total (some endpoints only send isLast): walk pages sequentially
+            start_at = len(first_values)
+            while True:
+                page = fetch(start_at)
+                values = page.get(values_key, [])
+                yield from values
+                if page.get('isLast') or not values:
+                    return
+                start_at += len(values)
+
+        offsets = list(range(granted, total, granted))
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='jira-page') as pool:
+            for i in range(0, len(offsets), max_workers):
+                window = [pool.submit(fetch, start_at) for start_at in offsets[i:i + max_workers]]
+                for future in window:
+                    yield from future.result().get(values_key, [])
+
+    return total, items()
+
+
+def is_done_status(issue_json: dict) -> bool:
+    """Determine if an issue is in a 'done' category/state."""
+    try:
+        status = issue_json['fields']['status']
+        # Prefer statusCategory if available
+        cat = status.get('statusCategory', {}).get('key')
+        if cat:
+            return cat.lower() == 'done'
+        # Fallback to name matching
+        name = status.get('name', '').lower()
+        return name in {'done', 'closed', 'resolved', 'complete'}
+    except Exception:
+        return False
+
+
+def is_issue_complete(watcher: 'JiraWatcher', parent: dict) -> bool:
+    """True if the issue is done, or, when it has subtasks, all of them are."""
+    subtasks = parent.get('fields', {}).get('subtasks', []) or []
+
+    if not subtasks:
+        # No subtasks; consider parent status only
+        return is_done_status(parent)
+
+    for st in subtasks:
+        st_key = st.get('key')
+        if not st_key:
+            continue
+        st_issue = watcher.get_issue(st_key)
+        if not is_done_status(st_issue):
+            return False
+    return True
+
+
 class JiraWatcher:
     def __init__(self, access_token, cloud_id):
         if not access_token or not cloud_id:
@@ -21,7 +119,8 @@ class JiraWatcher:
 
     def _get_issue_platform_v3(self, issue_key):
         url = f"{API_URL}/ex/jira/{self.cloud_id}/rest/agile/1.0/issue/{issue_key}"
-        resp = requests.get(url, headers=self.headers)
+        with upstream_slot('jira'):
+            resp = requests.get(url, headers=self.headers, timeout=HTTP_TIMEOUT_SECONDS)
         return url, resp
 
     def get_issue(self, issue_key):
@@ -40,6 +139,28 @@ class JiraWatcher:
             raise e
         return response.json()
 
+    def check_issue_status(self, issue_key, last_status=None, issue=None, audience=None):
+        """Single poll of an issue's status; publishes a change event if it moved.
+
+        Returns the current status name. Used by the durable scheduler, which
+        keeps last_status between polls instead of a thread's stack. Pass an
+        already fetched `issue` to avoid a second request, and the session ids
+        watching it as `audience` so subscribers need no lookup per event.
+        """
+        if issue is None:
+            issue = self.get_issue(issue_key)
+        current_status = issue['fields']['status']['name']
+        scope = {'issue_key': issue_key, 'cloud_id': self.cloud_id, 'audience': audience}
+        if last_status is None:
+            print(f"Initial status for {issue_key}: '{current_status}'")
+            broker.publish('watcher_health', state='started', status=current_status, **scope)
+        elif current_status != last_status:
+            print(f"\n✨ Status changed for {issue_key}: '{last_status}' -> '{current_status}'")
+            broker.publish('status_change', old_status=last_status, new_status=current_status, **scope)
+        else:
+            broker.publish('watcher_health', state='alive', status=current_status, **scope)
+        return current_status
+
     def watch_issue_status(self, issue_key, interval=15):
         """Monitors a Jira issue for status changes and prints updates."""
         print(f"\n🔍 Watching issue {issue_key} for status changes (checking every {interval} seconds)...")
@@ -49,8 +170,10 @@ class JiraWatcher:
             initial_issue = self.get_issue(issue_key)
             last_status = initial_issue['fields']['status']['name']
             print(f"Initial status for {issue_key}: '{last_status}'")
+            broker.publish('watcher_health', issue_key=issue_key, state='started', status=last_status)
         except requests.exceptions.RequestException as e:
             print(f"\u274c Could not fetch initial status for {issue_key}: {e}")
+            broker.publish('watcher_health', issue_key=issue_key, state='failed', error=str(e))
             return
 
         while True:
@@ -61,14 +184,93 @@ class JiraWatcher:
 
                 if current_status != last_status:
                     print(f"\n✨ Status changed for {issue_key}: '{last_status}' -> '{current_status}'")
+                    broker.publish('status_change', issue_key=issue_key, old_status=last_status, new_status=current_status)
                     last_status = current_status
                 else:
                     print(f".", end="", flush=True)  # Print a dot to show it's still running
+                    broker.publish('watcher_health', issue_key=issue_key, state='alive', status=current_status)
 
             except requests.exceptions.RequestException as e:
                 print(f"\n\u274c Error while watching {issue_key}: {e}")
                 print("Stopping watcher.")
+                broker.publish('watcher_health', issue_key=issue_key, state='stopped', error=str(e))
                 break
             except KeyboardInterrupt:
                 print("\n🛑 Watcher stopped by user.")
+                broker.publish('watcher_health', issue_key=issue_key, state='stopped')
                 break
+
+
+class NeedsAuth(Exception):
+    """No stored credential can read the issue; a user has to sign in again."""
+
+
+class IssueNotFound(Exception):
+    """Every stored credential got a 404: the issue was deleted or moved."""
+
+
+class SharedJiraWatcher(JiraWatcher):
+    """JiraWatcher that polls with whichever stored credential can read the issue.
+
+    Used for shared per-issue polls: the token belongs to no particular
+    session. `credentials` returns candidate tokens (best first);
+    `on_result(token, ok)` is told which tokens worked or were rejected;
+    `refresh(token)` swaps an expired token for a new one, or returns None.
+    """
+
+    def __init__(self, cloud_id, credentials, on_result=None, refresh=None):
+        if not cloud_id:
+            raise ValueError("Cloud ID is required.")
+        self.cloud_id = cloud_id
+        self.credentials = credentials
+        self.on_result = on_result or (lambda token, ok: None)
+        self.refresh = refresh or (lambda token: None)
+        self._use_token(None)
+
+    def _use_token(self, access_token):
+        self.access_token = access_token
+        self.headers = {
+            'Authorization': f'Bearer {access_token}',
+            'Accept': 'application/json'
+        }
+
+    def get_issue(self, issue_key):
+        """Fetch an issue, trying each credential until one is allowed to read it."""
+        # Keep using a token that already worked during this poll
+        tokens = ([self.access_token] if self.access_token else []) + \
+            [t for t in self.credentials() if t != self.access_token]
+        not_found = 0
+        for token in tokens:
+            self._use_token(token)
+            try:
+                issue = self._get_with_refresh(issue_key)
+            except requests.exceptions.HTTPError as e:
+                status = e.response.status_code if e.response is not None else None
+                if status in (401, 403):
+                    # Revoked, or expired and could not be refreshed: stop offering it to any poll
+                    self.on_result(self.access_token, False)
+                    continue
+                if status == 404:
+                    # Jira answers 404 when this user cannot see the issue
+                    not_found += 1
+                    continue
+                raise
+            self.on_result(self.access_token, True)
+            return issue
+        self._use_token(None)
+        if tokens and not_found == len(tokens):
+            raise IssueNotFound(f"{issue_key} not found on cloud {self.cloud_id} with any stored credential")
+        raise NeedsAuth(f"No stored credential can read {issue_key} on cloud {self.cloud_id}")
+
+    def _get_with_refresh(self, issue_key):
+        try:
+            return super().get_issue(issue_key)
+        except requests.exceptions.HTTPError as e:
+            if e.response is None or e.response.status_code != 401:
+                raise
+            # Access tokens last about an hour; trade the refresh token for a new one
+            fresh = self.refresh(self.access_token)
+            if not fresh:
+                raise
+            self._use_token(fresh)
+            return super().get_issue(issue_key)
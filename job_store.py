@@ -0,0 +1,389 @@
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+JOB_STORE_PATH = os.getenv('JOB_STORE_PATH', 'jobs.db')
+
+# How long a claimed job is hidden from other claims while it is being run
+CLAIM_LEASE_SECONDS = 300
+
+
+class JobStore:
+    """Durable on-disk queue of watch jobs (SQLite).
+
+    Each job polls one Jira issue, keyed by (cloud_id, issue_key), with its
+    next-due time and last known state, so a restart can resume every watch
+    exactly where it stopped. Interests record who the poll result is for,
+    and credentials hold the tokens a poll may use. The same file
+    also keeps the per-record snapshots used by the sync pipeline's change
+    detection.
+    """
+
+    def __init__(self, path=JOB_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                cloud_id TEXT NOT NULL,
+                issue_key TEXT NOT NULL,
+                interval INTEGER NOT NULL,
+                next_due REAL NOT NULL,
+                leased_until REAL,
+                last_state TEXT,
+                status TEXT NOT NULL DEFAULT 'active',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_due ON jobs (status, next_due)")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS snapshots (
+                system TEXT NOT NULL,
+                record_key TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                fields TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (system, record_key)
+            )
+        """)
+        # Which session wants what from each shared job (status watchers, Monday items)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS interests (
+                job_id TEXT NOT NULL,
+                interest_id TEXT NOT NULL,
+                session_id TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                interval INTEGER NOT NULL,
+                payload TEXT NOT NULL DEFAULT '{}',
+                created_at REAL NOT NULL,
+                PRIMARY KEY (job_id, interest_id)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS interests_session ON interests (session_id, job_id)")
+        # Tokens any session contributed; a shared poll may use whichever works
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS credentials (
+                cloud_id TEXT NOT NULL,
+                session_id TEXT NOT NULL,
+                access_token TEXT NOT NULL,
+                refresh_token TEXT,
+                previous_access_token TEXT,
+                valid INTEGER NOT NULL DEFAULT 1,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (cloud_id, session_id)
+            )
+        """)
+        # Writes that were still pending when the process was told to stop
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pending_writes (
+                write_id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+
+    @staticmethod
+    def make_job_id(cloud_id, issue_key):
+        """Jobs are keyed by the Jira resource, not by who asked for it."""
+        return f"{cloud_id}:{issue_key}"
+
+    def _row_to_job(self, row):
+        job = dict(row)
+        job['last_state'] = json.loads(job['last_state']) if job['last_state'] else None
+        return job
+
+    def add_interest(self, cloud_id, issue_key, interest_id, kind, interval, session_id, payload=None, first_due=None):
+        """Register a session's interest in a Jira issue, sharing one poll job per (cloud_id, issue_key).
+
+        A new or finished job is (re)started; an active one keeps its schedule
+        and state. The job polls at the shortest interval its interests ask for.
+        Re-adding the same interest_id refreshes its payload and interval and
+        restarts its age (see the status watch expiry in app.py).
+        """
+        job_id = self.make_job_id(cloud_id, issue_key)
+        now = time.time()
+        first_due = now if first_due is None else first_due
+        with self._lock:
+            self._conn.execute("""
+                INSERT INTO jobs (job_id, kind, cloud_id, issue_key, interval, next_due,
+                                  status, attempts, updated_at)
+                VALUES (?, 'issue', ?, ?, ?, ?, 'active', 0, ?)
+                ON CONFLICT(job_id) DO UPDATE SET
+                    next_due = CASE WHEN jobs.status = 'active' THEN jobs.next_due ELSE excluded.next_due END,
+                    last_state = CASE WHEN jobs.status = 'active' THEN jobs.last_state ELSE NULL END,
+                    attempts = CASE WHEN jobs.status = 'active' THEN jobs.attempts ELSE 0 END,
+                    status = 'active',
+                    updated_at = excluded.updated_at
+            """, (job_id, cloud_id, issue_key, interval, first_due, now))
+            self._conn.execute("""
+                INSERT INTO interests (job_id, interest_id, session_id, kind, interval, payload, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(job_id, interest_id) DO UPDATE SET
+                    payload = excluded.payload,
+                    interval = excluded.interval,
+                    created_at = excluded.created_at
+            """, (job_id, interest_id, session_id, kind, interval, json.dumps(payload or {}), now))
+            self._recompute_interval(job_id)
+        return job_id
+
+    def _recompute_interval(self, job_id):
+        # Caller holds self._lock. A job with no interests left keeps its interval.
+        self._conn.execute("""
+            UPDATE jobs SET interval = COALESCE(
+                (SELECT MIN(interval) FROM interests WHERE job_id = ?), interval)
+            WHERE job_id = ?
+        """, (job_id, job_id))
+
+    def get_interests(self, job_id):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT interest_id, session_id, kind, payload, created_at FROM interests "
+                "WHERE job_id = ? ORDER BY created_at",
+                (job_id,)
+            ).fetchall()
+        return [{'interest_id': r['interest_id'], 'session_id': r['session_id'], 'kind': r['kind'],
+                 'payload': json.loads(r['payload']), 'created_at': r['created_at']}
+                for r in rows]
+
+    def interest_sessions(self, job_id):
+        """Session ids with any interest in the job."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT session_id FROM interests WHERE job_id = ?", (job_id,)
+            ).fetchall()
+        return {r['session_id'] for r in rows}
+
+    def session_watches(self, session_id, cloud_id, issue_key):
+        """True if the session has registered any interest in the issue."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM interests WHERE job_id = ? AND session_id = ? LIMIT 1",
+                (self.make_job_id(cloud_id, issue_key), session_id)
+            ).fetchone()
+        return row is not None
+
+    def remove_interests(self, job_id, interest_ids):
+        """Drop interests from a job and re-derive its poll interval from the rest.
+
+        Returns how many were removed.
+        """
+        with self._lock:
+            removed = self._conn.executemany(
+                "DELETE FROM interests WHERE job_id = ? AND interest_id = ?",
+                [(job_id, interest_id) for interest_id in interest_ids]
+            ).rowcount
+            self._recompute_interval(job_id)
+        return removed
+
+    def save_credential(self, cloud_id, session_id, access_token, refresh_token=None):
+        """Remember a session's tokens as usable for polling anything on cloud_id.
+
+        A credential that carries a refresh token is only replaced by another
+        one that does, so re-sharing a session's (possibly stale) access token
+        never undoes a background refresh. Jobs on that cloud parked as
+        'needs_auth' are due again right away. Returns how many were resumed.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("""
+                INSERT INTO credentials (cloud_id, session_id, access_token, refresh_token, valid, updated_at)
+                VALUES (?, ?, ?, ?, 1, ?)
+                ON CONFLICT(cloud_id, session_id) DO UPDATE SET
+                    access_token = excluded.access_token,
+                    previous_access_token = NULL,
+                    refresh_token = excluded.refresh_token,
+                    valid = 1,
+                    updated_at = excluded.updated_at
+                WHERE excluded.refresh_token IS NOT NULL OR credentials.refresh_token IS NULL
+            """, (cloud_id, session_id, access_token, refresh_token, now))
+            resumed = self._conn.execute("""
+                UPDATE jobs SET status = 'active', next_due = ?, attempts = 0, updated_at = ?
+                WHERE cloud_id = ? AND status = 'needs_auth'
+            """, (now, now, cloud_id)).rowcount
+        return resumed
+
+    def credential_by_token(self, cloud_id, access_token):
+        """The stored credential an access token belongs to, also matching the
+        token it replaced last; None if unknown. Returns a dict with
+        session_id, access_token (the current one) and refresh_token."""
+        with self._lock:
+            row = self._conn.execute("""
+                SELECT session_id, access_token, refresh_token FROM credentials
+                WHERE cloud_id = ? AND (access_token = ? OR previous_access_token = ?)
+                ORDER BY access_token = ? DESC
+                LIMIT 1
+            """, (cloud_id, access_token, access_token, access_token)).fetchone()
+        return dict(row) if row else None
+
+    def rotate_credential(self, cloud_id, session_id, access_token, refresh_token):
+        """Replace a refreshed credential's tokens in place (refresh tokens rotate on use)."""
+        with self._lock:
+            self._conn.execute("""
+                UPDATE credentials SET previous_access_token = access_token, access_token = ?,
+                    refresh_token = COALESCE(?, refresh_token), valid = 1, updated_at = ?
+                WHERE cloud_id = ? AND session_id = ?
+            """, (access_token, refresh_token, time.time(), cloud_id, session_id))
+
+    def credentials_for(self, cloud_id):
+        """Valid access tokens for a cloud, most recently confirmed first."""
+        with self._lock:
+            rows = self._conn.execute("""
+                SELECT access_token FROM credentials
+                WHERE cloud_id = ? AND valid = 1
+                ORDER BY updated_at DESC
+            """, (cloud_id,)).fetchall()
+        return [r['access_token'] for r in rows]
+
+    def mark_credential(self, cloud_id, access_token, valid):
+        """Record that a token was accepted (moves it to the front) or rejected."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE credentials SET valid = ?, updated_at = ? WHERE cloud_id = ? AND access_token = ?",
+                (1 if valid else 0, time.time(), cloud_id, access_token)
+            )
+
+    def release(self, job_id):
+        """Give back a claimed job that could not be started; it stays due."""
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET leased_until = NULL WHERE job_id = ?", (job_id,))
+
+    def save_pending_write(self, write_id, kind, payload):
+        """Persist a write until it has succeeded; replayed on startup if still here."""
+        with self._lock:
+            self._conn.execute("""
+                INSERT OR REPLACE INTO pending_writes (write_id, kind, payload, created_at)
+                VALUES (?, ?, ?, ?)
+            """, (write_id, kind, json.dumps(payload), time.time()))
+
+    def pending_writes(self):
+        """All persisted writes that have not succeeded yet, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT write_id, kind, payload FROM pending_writes ORDER BY created_at"
+            ).fetchall()
+        return [{'write_id': r['write_id'], 'kind': r['kind'], 'payload': json.loads(r['payload'])}
+                for r in rows]
+
+    def delete_pending_write(self, write_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM pending_writes WHERE write_id = ?", (write_id,))
+
+    def claim_due(self, limit=50, now=None):
+        """Return up to `limit` due jobs, leasing them so they are not claimed twice."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute("""
+                    SELECT * FROM jobs
+                    WHERE status = 'active' AND next_due <= ?
+                      AND (leased_until IS NULL OR leased_until <= ?)
+                    ORDER BY next_due
+                    LIMIT ?
+                """, (now, now, limit)).fetchall()
+                self._conn.executemany(
+                    "UPDATE jobs SET leased_until = ? WHERE job_id = ?",
+                    [(now + CLAIM_LEASE_SECONDS, r['job_id']) for r in rows]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [self._row_to_job(r) for r in rows]
+
+    def complete_run(self, job_id, next_due, last_state, status='active', attempts=0):
+        """Persist the outcome of one run of a job."""
+        with self._lock:
+            self._conn.execute("""
+                UPDATE jobs
+                SET next_due = ?, last_state = ?, status = ?, attempts = ?,
+                    leased_until = NULL, updated_at = ?
+                WHERE job_id = ?
+            """, (next_due, json.dumps(last_state) if last_state is not None else None,
+                  status, attempts, time.time(), job_id))
+
+    def next_due_time(self):
+        """Earliest next-due time of any active job, or None if there are none."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(MAX(next_due, COALESCE(leased_until, 0))) AS due "
+                "FROM jobs WHERE status = 'active'"
+            ).fetchone()
+        return row['due'] if row else None
+
+    def spread_overdue(self, now=None):
+        """Reschedule jobs that fell due while the process was down.
+
+        Each overdue job gets a random slot within its own interval instead of
+        all of them firing at once on startup. Jobs that were not yet due keep
+        their original schedule. Leases left behind by the previous process
+        are released, since the runs that held them died with it.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET leased_until = NULL WHERE leased_until IS NOT NULL")
+            rows = self._conn.execute(
+                "SELECT job_id, interval FROM jobs WHERE status = 'active' AND next_due <= ?",
+                (now,)
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE jobs SET next_due = ? WHERE job_id = ?",
+                [(now + random.uniform(0, r['interval']), r['job_id']) for r in rows]
+            )
+        return len(rows)
+
+    def count_active(self):
+        """Jobs holding a watch slot: polling, or parked until someone signs in."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) AS n FROM jobs WHERE status IN ('active', 'needs_auth')"
+            ).fetchone()
+        return row['n']
+
+    def count_new_jobs(self, cloud_id, issue_keys):
+        """How many of the issues would start a new job rather than join one."""
+        job_ids = [self.make_job_id(cloud_id, key) for key in set(issue_keys)]
+        if not job_ids:
+            return 0
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT COUNT(*) AS n FROM jobs WHERE status IN ('active', 'needs_auth') "
+                f"AND job_id IN ({','.join('?' * len(job_ids))})",
+                job_ids
+            ).fetchone()
+        return len(job_ids) - row['n']
+
+    def load_snapshots(self, system):
+        """Last synced snapshot of every record of one system: {key: (hash, fields)}."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT record_key, content_hash, fields FROM snapshots WHERE system = ?",
+                (system,)
+            ).fetchall()
+        return {r['record_key']: (r['content_hash'], json.loads(r['fields'])) for r in rows}
+
+    def save_snapshots(self, system, snapshots):
+        """Store snapshots for one system; snapshots is {key: (hash, fields)}."""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany("""
+                INSERT INTO snapshots (system, record_key, content_hash, fields, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(system, record_key) DO UPDATE SET
+                    content_hash = excluded.content_hash,
+                    fields = excluded.fields,
+                    updated_at = excluded.updated_at
+            """, [(system, key, h, json.dumps(fields), now) for key, (h, fields) in snapshots.items()])
@@ -3,6 +3,9 @@ import json
 import base64
 from requests.auth import HTTPBasicAuth
 
+from jira_api import paginate_agile
+from executor import HTTP_TIMEOUT_SECONDS, upstream_slot
+
 from pathlib import Path
 import os
 
@@ -12,23 +15,32 @@ load_dotenv()
 MONDAY_API_TOKEN = os.getenv('MONDAY_API_TOKEN')
 MONDAY_MAINTENCE_BOARD_ID = os.getenv('MONDAY_MAINTENCE_BOARD_ID')
 MONDAY_DX_RESOURCING_BOARD_ID = os.getenv('MONDAY_DX_RESOURCING_BOARD_ID')  
+# Column IDs on the Monday boards (see output.txt for the full list)
+MONDAY_STATUS_COLUMN_ID = os.getenv('MONDAY_STATUS_COLUMN_ID', 'color_mkrbrgx9')
+MONDAY_JIRA_LINK_COLUMN_ID = os.getenv('MONDAY_JIRA_LINK_COLUMN_ID', 'link_mkncp8tr')
+# Status column on the resourcing board; unset leaves that board out of the sync pipeline
+MONDAY_RESOURCING_STATUS_COLUMN_ID = os.getenv('MONDAY_RESOURCING_STATUS_COLUMN_ID')
 
 
 
 
 def get_board_issues(domain, headers, auth, board_id):
-    """Get all issues from a specific board"""
+    """Get all issues from a specific board, printing them page by page"""
     issues_url = f'https://{domain}/rest/agile/1.0/board/{board_id}/issue'
     
     print(f"\nGetting issues from board {board_id}...")
-    response = requests.get(issues_url, headers=headers, auth=auth)
-    
-    if response.status_code == 200:
-        issues_data = response.json()
-        print(f"\nFound {len(issues_data.get('issues', []))} issues:")
-        print("-" * 80)
-        
-        for issue in issues_data.get('issues', []):
+    try:
+        total, issues = paginate_agile(issues_url, headers=headers, auth=auth, values_key='issues')
+    except requests.exceptions.HTTPError as e:
+        print(f"Error getting issues from board {board_id}:", e.response.status_code, e.response.text)
+        return
+
+    print(f"\nFound {total if total is not None else 'unknown number of'} issues:")
+    print("-" * 80)
+
+    count = 0
+    try:
+        for issue in issues:
             fields = issue.get('fields', {})
             print(f"Key: {issue['key']}")
             print(f"Summary: {fields.get('summary', 'N/A')}")
@@ -36,9 +48,12 @@ def get_board_issues(domain, headers, auth, board_id):
             print(f"Assignee: {fields.get('assignee', {}).get('displayName', 'Unassigned') if fields.get('assignee') else 'Unassigned'}")
             print(f"Priority: {fields.get('priority', {}).get('name', 'N/A') if fields.get('priority') else 'N/A'}")
             print("-" * 40)
-            
-    else:
-        print(f"Error getting issues from board {board_id}:", response.status_code, response.text)
+            count += 1
+    except requests.exceptions.RequestException as e:
+        # A later page failed: don't report a partial listing as complete
+        print(f"Error getting issues from board {board_id} after {count} issue(s): {e}")
+        return
+    return count
 
 
 def change_board_status(item_id, board_id, status):
@@ -85,7 +100,8 @@ def change_board_status(item_id, board_id, status):
     data = {'query': mutation}
 
 
-    response = requests.post(url=monday_url, json=data, headers=headers)
+    with upstream_slot('monday'):
+        response = requests.post(url=monday_url, json=data, headers=headers, timeout=HTTP_TIMEOUT_SECONDS)
     
     if response.status_code == 200:
         result = response.json()
@@ -116,6 +132,133 @@ def change_board_status(item_id, board_id, status):
         return False
 
 
+def change_board_statuses(updates, batch_size=25):
+    """
+    Change the status of many Monday.com items in as few requests as possible.
+
+    Mutations are sent as aliased fields of one GraphQL document per batch.
+
+    Args:
+        updates (list): (item_id, board_id, status) tuples, or
+            (item_id, board_id, status, column_id) for a status column other
+            than MONDAY_STATUS_COLUMN_ID
+        batch_size (int): Mutations per request
+
+    Returns:
+        list: item IDs that were updated successfully
+    """
+    monday_url = 'https://api.monday.com/v2'
+    headers = {
+        'Authorization': f"{MONDAY_API_TOKEN}",
+        'Content-Type': 'application/json'
+    }
+
+    updated = []
+    for start in range(0, len(updates), batch_size):
+        batch = updates[start:start + batch_size]
+        fields = []
+        for i, (item_id, board_id, status, *column) in enumerate(batch):
+            column_id = column[0] if column else MONDAY_STATUS_COLUMN_ID
+            value = json.dumps(json.dumps({"label": status}))  # GraphQL string literal
+            fields.append(
+                f'u{i}: change_column_value(item_id: {item_id}, board_id: {board_id}, '
+                f'column_id: "{column_id}", value: {value}) {{ id }}'
+            )
+        mutation = "mutation {\n" + "\n".join(fields) + "\n}"
+
+        with upstream_slot('monday'):
+            response = requests.post(url=monday_url, json={'query': mutation}, headers=headers,
+                                     timeout=HTTP_TIMEOUT_SECONDS)
+        if response.status_code != 200:
+            print(f"❌ Error: {response.status_code}")
+            print(f"Response: {response.text}")
+            continue
+
+        result = response.json()
+        if 'errors' in result:
+            print("GraphQL Errors:")
+            for error in result['errors']:
+                print(f"  - {error['message']}")
+
+        data = result.get('data') or {}
+        for i, (item_id, *_) in enumerate(batch):
+            if data.get(f'u{i}'):
+                updated.append(str(item_id))
+
+    print(f"✅ Updated {len(updated)} of {len(updates)} Monday items")
+    return updated
+
+
+def fetch_board_items(board_id, column_ids, page_limit=500):
+    """
+    Fetch every item on a Monday.com board with the text of selected columns.
+
+    Follows items_page cursors, so boards larger than one page come back whole.
+
+    Args:
+        board_id (str): The board to read
+        column_ids (list): Column IDs whose text should be returned
+
+    Returns:
+        list: dicts of { 'id': str, 'name': str, 'columns': { column_id: text } }
+    """
+    monday_url = 'https://api.monday.com/v2'
+    headers = {
+        'Authorization': f"{MONDAY_API_TOKEN}",
+        'Content-Type': 'application/json'
+    }
+    columns = json.dumps(list(column_ids))
+    item_fields = f"id name column_values(ids:{columns}) {{ id text }}"
+
+    query = f"""
+    {{
+        boards(ids:[{board_id}]) {{
+            items_page(limit: {page_limit}) {{
+                cursor
+                items {{ {item_fields} }}
+            }}
+        }}
+    }}
+    """
+
+    items = []
+    while True:
+        with upstream_slot('monday'):
+            response = requests.post(url=monday_url, json={'query': query}, headers=headers,
+                                     timeout=HTTP_TIMEOUT_SECONDS)
+        if response.status_code != 200:
+            raise RuntimeError(f"Monday API error {response.status_code}: {response.text}")
+        result = response.json()
+        if 'errors' in result:
+            raise RuntimeError(f"Monday GraphQL errors: {result['errors']}")
+
+        data = result.get('data', {})
+        if 'next_items_page' in data:
+            page = data['next_items_page']
+        else:
+            boards = data.get('boards', [])
+            page = boards[0].get('items_page', {}) if boards else {}
+
+        for item in page.get('items', []):
+            items.append({
+                'id': item['id'],
+                'name': item['name'],
+                'columns': {cv['id']: cv.get('text') or '' for cv in item.get('column_values', [])}
+            })
+
+        cursor = page.get('cursor')
+        if not cursor:
+            return items
+        query = f"""
+        {{
+            next_items_page(limit: {page_limit}, cursor: {json.dumps(cursor)}) {{
+                cursor
+                items {{ {item_fields} }}
+            }}
+        }}
+        """
+
+
 def get_item_id_by_name(item_name, board_ids=[MONDAY_MAINTENCE_BOARD_ID, MONDAY_DX_RESOURCING_BOARD_ID]):
     """
     Helper function to get an item ID by its name.
@@ -150,7 +293,8 @@ def get_item_id_by_name(item_name, board_ids=[MONDAY_MAINTENCE_BOARD_ID, MONDAY_
     """
     
     data = {'query': query}
-    response = requests.post(url=monday_url, json=data, headers=headers)
+    with upstream_slot('monday'):
+        response = requests.post(url=monday_url, json=data, headers=headers, timeout=HTTP_TIMEOUT_SECONDS)
     
     if response.status_code == 200:
         result = response.json()
@@ -206,7 +350,8 @@ def test_monday_api():
     """
     
     data = {'query': query}
-    response = requests.post(url=monday_url, json=data, headers=headers)
+    with upstream_slot('monday'):
+        response = requests.post(url=monday_url, json=data, headers=headers, timeout=HTTP_TIMEOUT_SECONDS)
     
     if response.status_code == 200:
         result = response.json()
@@ -307,7 +452,8 @@ def get_all_jira_issue(board_id):
     """
 
     data = {'query': query}
-    response = requests.post(url=monday_url, json=data, headers=headers)
+    with upstream_slot('monday'):
+        response = requests.post(url=monday_url, json=data, headers=headers, timeout=HTTP_TIMEOUT_SECONDS)
 
     if response.status_code != 200:
         print(f"❌ Error: {response.status_code}")
@@ -0,0 +1,142 @@
+import threading
+import time
+
+from events import broker
+from executor import QueueFull, ShuttingDown
+from jira_api import IssueNotFound, NeedsAuth
+
+# Longest back-off between retries of a job that keeps failing
+MAX_BACKOFF_SECONDS = 900
+
+
+class WatchScheduler:
+    """Runs durable watch jobs from a JobStore when they fall due.
+
+    Handlers are registered per job kind. A handler receives the job dict and
+    returns (done, last_state); done=True retires the job, otherwise it is
+    rescheduled one interval later with last_state persisted. A handler that
+    raises NeedsAuth parks the job as 'needs_auth' until a user signs in again;
+    IssueNotFound marks it 'failed'.
+
+    Jobs run on the shared ManagedExecutor. At most `max_in_flight` of them
+    are queued or running at once, leaving room for other background work.
+    """
+
+    def __init__(self, store, executor, max_in_flight=6, batch_size=50, idle_seconds=5):
+        self.store = store
+        self.executor = executor
+        self.batch_size = batch_size
+        self.idle_seconds = idle_seconds
+        self.max_in_flight = max_in_flight
+        self.handlers = {}
+        self._in_flight = 0
+        self._in_flight_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def register(self, kind, handler):
+        self.handlers[kind] = handler
+
+    def start(self):
+        """Resume stored jobs and start the scheduling loop (idempotent)."""
+        if self._thread and self._thread.is_alive():
+            return
+        spread = self.store.spread_overdue()
+        print(f"Scheduler resuming {self.store.count_active()} stored watches ({spread} overdue, spread out)")
+        self._thread = threading.Thread(target=self._run, name='watch-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def wake(self):
+        """Re-check the queue now, e.g. after a new job was added."""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            # Only claim what the executor can take right away, so leased jobs
+            # never sit in a local backlog while their lease runs out
+            with self._in_flight_lock:
+                free = min(self.max_in_flight - self._in_flight, self.executor.available())
+            jobs = self.store.claim_due(limit=min(self.batch_size, free)) if free > 0 else []
+            for i, job in enumerate(jobs):
+                with self._in_flight_lock:
+                    self._in_flight += 1
+                try:
+                    self.executor.submit(self._run_job, job, name=f"poll {job['job_id']}")
+                except (QueueFull, ShuttingDown):
+                    # Lost the race for queue space (or draining): hand the rest back
+                    with self._in_flight_lock:
+                        self._in_flight -= 1
+                    for unstarted in jobs[i:]:
+                        self.store.release(unstarted['job_id'])
+                    free = 0
+                    break
+            if jobs and free > 0:
+                continue
+            if free <= 0:
+                # Executor is busy: wait for a running job to finish
+                self._wake.wait(self.idle_seconds)
+                self._wake.clear()
+                continue
+
+            # Nothing due: sleep until the next job is due or we are woken
+            next_due = self.store.next_due_time()
+            timeout = self.idle_seconds if next_due is None else max(0.0, min(next_due - time.time(), self.idle_seconds))
+            self._wake.wait(timeout)
+            self._wake.clear()
+
+    def _run_job(self, job):
+        try:
+            self._run_handler(job)
+        finally:
+            with self._in_flight_lock:
+                self._in_flight -= 1
+            self._wake.set()
+
+    def _audience(self, job):
+        # Sessions interested in the job, looked up once per event rather than per subscriber
+        return self.store.interest_sessions(job['job_id'])
+
+    def _run_handler(self, job):
+        handler = self.handlers.get(job['kind'])
+        if handler is None:
+            print(f"No handler registered for job kind '{job['kind']}' ({job['job_id']})")
+            self.store.complete_run(job['job_id'], time.time(), job['last_state'], status='failed')
+            return
+
+        try:
+            done, last_state = handler(job)
+        except IssueNotFound as e:
+            print(f"Giving up on {job['job_id']}: {e}")
+            broker.publish('watcher_health', audience=self._audience(job), issue_key=job['issue_key'],
+                           cloud_id=job['cloud_id'], state='failed',
+                           job_id=job['job_id'], error=str(e))
+            self.store.complete_run(job['job_id'], time.time(), job['last_state'], status='failed')
+            return
+        except NeedsAuth as e:
+            print(f"Parking {job['job_id']} until someone signs in again: {e}")
+            broker.publish('watcher_health', audience=self._audience(job), issue_key=job['issue_key'],
+                           cloud_id=job['cloud_id'], state='needs_auth',
+                           job_id=job['job_id'], error=str(e))
+            self.store.complete_run(job['job_id'], time.time(), job['last_state'], status='needs_auth')
+            return
+        except Exception as e:
+            attempts = job['attempts'] + 1
+            delay = min(job['interval'] * (2 ** (attempts - 1)), MAX_BACKOFF_SECONDS)
+            print(f"Error while running {job['job_id']}: {e} (retry in {delay}s)")
+            broker.publish('watcher_health', audience=self._audience(job), issue_key=job['issue_key'],
+                           cloud_id=job['cloud_id'], state='error',
+                           job_id=job['job_id'], error=str(e), retry_in=delay)
+            self.store.complete_run(job['job_id'], time.time() + delay, job['last_state'], attempts=attempts)
+            return
+
+        if done:
+            self.store.complete_run(job['job_id'], time.time(), last_state, status='done')
+            broker.publish('watcher_health', audience=self._audience(job), issue_key=job['issue_key'],
+                           cloud_id=job['cloud_id'], state='completed', job_id=job['job_id'])
+        else:
+            self.store.complete_run(job['job_id'], time.time() + job['interval'], last_state)
@@ -0,0 +1,278 @@
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from events import broker
+from executor import upstream_slot
+from jira_api import is_issue_complete
+from main import (
+    change_board_statuses,
+    fetch_board_items,
+    MONDAY_JIRA_LINK_COLUMN_ID,
+    MONDAY_RESOURCING_STATUS_COLUMN_ID,
+    MONDAY_STATUS_COLUMN_ID,
+)
+
+# Systems tracked by the pipeline; each maps record key -> normalized fields
+JIRA = 'jira'
+MONDAY_MAINTENANCE = 'monday_maintenance'
+MONDAY_RESOURCING = 'monday_resourcing'
+WORKAMAJIG = 'workamajig'
+
+# Canonical statuses: readers normalize each system's labels to these, and
+# plan() compares and copies only these between systems
+TODO = 'todo'
+IN_PROGRESS = 'in_progress'
+BLOCKED = 'blocked'
+DONE = 'done'
+
+# Label each system uses for a canonical status. A label missing here reads
+# as None and is never copied; a status missing here is never written.
+STATUS_LABELS = {
+    MONDAY_MAINTENANCE: {TODO: 'UPDATE NEEDED', DONE: 'UP TO DATE'},
+    MONDAY_RESOURCING: {TODO: 'Not Started', IN_PROGRESS: 'Working on it', BLOCKED: 'Stuck', DONE: 'Done'},
+    WORKAMAJIG: {TODO: 'Not Started', IN_PROGRESS: 'In Progress', BLOCKED: 'On Hold', DONE: 'Completed'},
+}
+
+# Status column of each Monday board the pipeline writes to
+MONDAY_STATUS_COLUMNS = {
+    MONDAY_MAINTENANCE: MONDAY_STATUS_COLUMN_ID,
+    MONDAY_RESOURCING: MONDAY_RESOURCING_STATUS_COLUMN_ID,
+}
+
+
+def content_hash(fields):
+    """Stable hash of a record's normalized fields."""
+    return hashlib.sha256(json.dumps(fields, sort_keys=True).encode()).hexdigest()
+
+
+def parse_jira_key(link_text):
+    # Expected formats: "WO-40 - https://..." or just "WO-40"
+    return link_text.split()[0] if link_text else None
+
+
+def normalize_status(system, label):
+    """Canonical status for one of a system's labels (case-insensitive), or None."""
+    label = (label or '').strip().lower()
+    for status, known in STATUS_LABELS[system].items():
+        if known.lower() == label:
+            return status
+    return None
+
+
+# --- Source readers --------------------------------------------------------
+
+def read_monday_board(system, board_id, with_jira_key=False):
+    records = {}
+    status_column = MONDAY_STATUS_COLUMNS[system]
+    column_ids = [status_column] + ([MONDAY_JIRA_LINK_COLUMN_ID] if with_jira_key else [])
+    for item in fetch_board_items(board_id, column_ids):
+        fields = {
+            'name': item['name'],
+            'status': normalize_status(system, item['columns'].get(status_column, '')),
+            'board_id': str(board_id),
+        }
+        if with_jira_key:
+            fields['jira_key'] = parse_jira_key(item['columns'].get(MONDAY_JIRA_LINK_COLUMN_ID, ''))
+        records[str(item['id'])] = fields
+    return records
+
+
+def read_workamajig(adapter):
+    return {
+        str(task['id']): {
+            'name': task.get('name', ''),
+            'status': normalize_status(WORKAMAJIG, task.get('status', '')),
+            'jira_key': task.get('jira_key'),
+        }
+        for task in adapter.list_tasks()
+    }
+
+
+def read_jira(watcher, issue_keys, max_workers=8):
+    """Read status for the given issues; issues that fail to load are left out."""
+    def fetch(key):
+        try:
+            issue = watcher.get_issue(key)
+            # Same rule as the completion watchers: the issue and all its subtasks
+            done = is_issue_complete(watcher, issue)
+        except Exception as e:
+            print(f"Skipping Jira {key} this run: {e}")
+            return key, None
+        return key, {
+            'status': issue.get('fields', {}).get('status', {}).get('name', ''),
+            'done': done,
+        }
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='sync-jira') as pool:
+        return {key: fields for key, fields in pool.map(fetch, sorted(issue_keys)) if fields}
+
+
+class SyncPipeline:
+    """Staged Jira / Monday / Workamajig sync.
+
+    read (labels normalized to canonical statuses) -> detect (content-hash
+    diff against the last committed snapshot) -> plan (map deltas to writes)
+    -> write (batched per system, statuses mapped back to labels) -> commit.
+    Only records whose content changed since the last run can produce writes,
+    and a write is only planned if the target does not already hold the value.
+    """
+
+    def __init__(self, store, watcher, workamajig, maintenance_board_id, resourcing_board_id=None,
+                 allowed_jira_keys=None, allowed_monday_names=None, session_id=None):
+        self.store = store
+        self.watcher = watcher
+        self.workamajig = workamajig
+        self.maintenance_board_id = maintenance_board_id
+        self.resourcing_board_id = resourcing_board_id
+        self.allowed_jira_keys = allowed_jira_keys
+        self.allowed_monday_names = allowed_monday_names
+        # Events go to the session that asked for the run (None = unscoped)
+        self.audience = {session_id} if session_id else None
+
+    def _monday_allowed(self, fields):
+        return self.allowed_monday_names is None or fields['name'] in self.allowed_monday_names
+
+    def _jira_allowed(self, key):
+        return self.allowed_jira_keys is None or key in self.allowed_jira_keys
+
+    def read(self):
+        current = {MONDAY_MAINTENANCE: read_monday_board(MONDAY_MAINTENANCE, self.maintenance_board_id,
+                                                         with_jira_key=True)}
+        if self.resourcing_board_id and MONDAY_STATUS_COLUMNS[MONDAY_RESOURCING]:
+            current[MONDAY_RESOURCING] = read_monday_board(MONDAY_RESOURCING, self.resourcing_board_id)
+        elif self.resourcing_board_id:
+            print("Skipping the resourcing board: MONDAY_RESOURCING_STATUS_COLUMN_ID is not set")
+        with upstream_slot('workamajig'):
+            current[WORKAMAJIG] = read_workamajig(self.workamajig)
+
+        linked = {f['jira_key'] for f in current[MONDAY_MAINTENANCE].values() if f.get('jira_key')}
+        linked |= {f['jira_key'] for f in current[WORKAMAJIG].values() if f.get('jira_key')}
+        current[JIRA] = read_jira(self.watcher, {k for k in linked if self._jira_allowed(k)})
+        return current
+
+    def detect(self, current):
+        """Return {system: {key: fields}} for new or changed records."""
+        changes = {}
+        for system, records in current.items():
+            previous = self.store.load_snapshots(system)
+            changes[system] = {
+                key: fields for key, fields in records.items()
+                if previous.get(key, (None,))[0] != content_hash(fields)
+            }
+        return changes
+
+    def plan(self, current, changes):
+        """Map deltas to writes: {(target_system, target_key): (status, (source_system, source_key))}.
+
+        Statuses are canonical; one the target has no label for is skipped.
+        """
+        writes = {}
+
+        def want(system, key, status, source):
+            if status not in STATUS_LABELS[system]:
+                return
+            target = current[system][key]
+            if target['status'] != status and (system, key) not in writes:
+                writes[(system, key)] = (status, source)
+
+        maintenance = current[MONDAY_MAINTENANCE]
+        resourcing = current.get(MONDAY_RESOURCING, {})
+        tasks = current[WORKAMAJIG]
+
+        # Jira issue finished -> linked maintenance items are up to date
+        for key, fields in changes[JIRA].items():
+            if not fields['done']:
+                continue
+            for item_id, item in maintenance.items():
+                if item.get('jira_key') == key and self._monday_allowed(item):
+                    want(MONDAY_MAINTENANCE, item_id, DONE, (JIRA, key))
+
+        # Maintenance status moved -> Workamajig task for the same Jira key follows
+        moved = set(changes[MONDAY_MAINTENANCE]) | {k for s, k in writes if s == MONDAY_MAINTENANCE}
+        for item_id in moved:
+            item = maintenance[item_id]
+            planned = writes.get((MONDAY_MAINTENANCE, item_id))
+            status = planned[0] if planned else item['status']
+            for task_id, task in tasks.items():
+                if item.get('jira_key') and task.get('jira_key') == item['jira_key']:
+                    want(WORKAMAJIG, task_id, status, (MONDAY_MAINTENANCE, item_id))
+
+        # Resourcing board <-> Workamajig, matched by name; Monday wins a conflict
+        tasks_by_name = {t['name'].lower(): task_id for task_id, t in tasks.items()}
+        items_by_name = {i['name'].lower(): item_id for item_id, i in resourcing.items()}
+        for item_id, item in changes.get(MONDAY_RESOURCING, {}).items():
+            task_id = tasks_by_name.get(item['name'].lower())
+            if task_id:
+                want(WORKAMAJIG, task_id, item['status'], (MONDAY_RESOURCING, item_id))
+        for task_id, task in changes[WORKAMAJIG].items():
+            item_id = items_by_name.get(task['name'].lower())
+            if item_id and item_id not in changes.get(MONDAY_RESOURCING, {}) and self._monday_allowed(resourcing[item_id]):
+                want(MONDAY_RESOURCING, item_id, task['status'], (WORKAMAJIG, task_id))
+
+        return writes
+
+    def write(self, current, writes):
+        """Apply planned writes in batches, mapping each canonical status back to
+        the target system's label; returns the set of (system, key) written."""
+        monday_updates = [
+            (key, current[system][key]['board_id'], STATUS_LABELS[system][status], MONDAY_STATUS_COLUMNS[system])
+            for (system, key), (status, _) in writes.items()
+            if system in (MONDAY_MAINTENANCE, MONDAY_RESOURCING)
+        ]
+        task_updates = [
+            {'id': key, 'status': STATUS_LABELS[WORKAMAJIG][status]}
+            for (system, key), (status, _) in writes.items()
+            if system == WORKAMAJIG
+        ]
+
+        monday_ok = set(change_board_statuses(monday_updates)) if monday_updates else set()
+        task_ok = set()
+        if task_updates:
+            with upstream_slot('workamajig'):
+                task_ok = set(self.workamajig.update_tasks(task_updates))
+
+        written = set()
+        for (system, key), (status, source) in writes.items():
+            ok = key in (task_ok if system == WORKAMAJIG else monday_ok)
+            if ok:
+                written.add((system, key))
+            if system != WORKAMAJIG:
+                broker.publish('monday_write', audience=self.audience,
+                               issue_key=current[system][key].get('jira_key'), monday_item_id=key, monday_item_name=current[system][key]['name'],
+                               status=STATUS_LABELS[system][status], ok=ok, source=source[0])
+        return written
+
+    def commit(self, current, changes, writes, written):
+        """Save snapshots. Written targets are saved with their new value so the
+        write does not echo back as a delta; sources of failed writes are not
+        saved so the delta is retried on the next run."""
+        failed_sources = {source for target, (_, source) in writes.items() if target not in written}
+        for system, records in current.items():
+            snapshots = {}
+            for key, fields in records.items():
+                if (system, key) in failed_sources:
+                    continue
+                if (system, key) in written:
+                    fields = {**fields, 'status': writes[(system, key)][0]}
+                elif key not in changes[system]:
+                    continue
+                snapshots[key] = (content_hash(fields), fields)
+            self.store.save_snapshots(system, snapshots)
+
+    def run(self):
+        current = self.read()
+        changes = self.detect(current)
+        writes = self.plan(current, changes)
+        written = self.write(current, writes) if writes else set()
+        self.commit(current, changes, writes, written)
+
+        summary = {
+            'read': {system: len(records) for system, records in current.items()},
+            'changed': {system: len(records) for system, records in changes.items()},
+            'planned_writes': len(writes),
+            'written': len(written),
+        }
+        broker.publish('sync_run', audience=self.audience, **summary)
+        print(f"Sync pipeline run: {summary}")
+        return summary
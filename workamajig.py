@@ -0,0 +1,58 @@
+import json
+import os
+import threading
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+WORKAMAJIG_LOCAL_PATH = os.getenv('WORKAMAJIG_LOCAL_PATH', 'workamajig_local.json')
+
+
+class LocalWorkamajigAdapter:
+    """File-backed stand-in for the Workamajig resourcing API.
+
+    Stores tasks in a JSON file so the sync pipeline can be exercised without
+    Workamajig credentials. A real adapter only needs the same two methods.
+
+    Task shape: { 'id': str, 'name': str, 'status': str, 'jira_key': str | None }
+    """
+
+    def __init__(self, path=WORKAMAJIG_LOCAL_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path) as f:
+            return json.load(f).get('tasks', [])
+
+    def _save(self, tasks):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'tasks': tasks}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def list_tasks(self):
+        """Return every resourcing task."""
+        with self._lock:
+            return self._load()
+
+    def update_tasks(self, updates):
+        """Apply a batch of {'id': str, 'status': str} updates.
+
+        Returns the IDs that were found and updated.
+        """
+        by_id = {str(u['id']): u for u in updates}
+        updated = []
+        with self._lock:
+            tasks = self._load()
+            for task in tasks:
+                update = by_id.get(str(task['id']))
+                if update:
+                    task['status'] = update['status']
+                    updated.append(str(task['id']))
+            self._save(tasks)
+        print(f"✅ Updated {len(updated)} of {len(updates)} Workamajig tasks (local)")
+        return updated